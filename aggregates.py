@@ -0,0 +1,102 @@
+import pandas as pd
+
+import perf
+
+# Dimensions of the meteorite cube; every Project 1 chart is a roll-up over these
+CUBE_DIMENSIONS = ['year', 'Continent Name', 'Country Name', 'recclass']
+# Columns build_cube reads
+CUBE_COLUMNS = CUBE_DIMENSIONS + ['id', 'mass (g)']
+
+
+# Function to build the cube of count, mass sum and mass count per (year, continent, country, class).
+# Landings that fall outside any country keep missing continent/country values. Masses are
+# summed as whole milligrams (mass_mg), so cubes built from chunks of rows and merged with
+# merge_cubes match the cube of all the rows exactly, whatever the chunking.
+@perf.timed('build_cube')
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    located = df.assign(
+        year=df['year'].astype('int64'),
+        mass_mg=(df['mass (g)'] * 1000).round().astype('Int64'),
+        mass_count=df['mass (g)'].notna(),
+    )
+    cube = located.groupby(CUBE_DIMENSIONS, dropna=False, observed=True).agg(
+        count=('id', 'size'),
+        mass_mg=('mass_mg', 'sum'),
+        mass_count=('mass_count', 'sum'),
+    )
+    return _with_mass_sum(cube)
+
+
+def _with_mass_sum(cube: pd.DataFrame) -> pd.DataFrame:
+    cube = cube.assign(mass_mg=cube['mass_mg'].astype('int64'))
+    return cube.assign(mass_sum=cube['mass_mg'] / 1000)[['count', 'mass_sum', 'mass_count', 'mass_mg']].reset_index()
+
+
+# Function to merge cubes built from disjoint chunks of rows into the cube of all of them.
+# Category columns are given the sorted union of the chunks' categories (as astype('category')
+# would on the whole table), so the result lines up with build_cube over the concatenated rows.
+def merge_cubes(cubes: list[pd.DataFrame]) -> pd.DataFrame:
+    combined = pd.concat(cubes, ignore_index=True)
+    for column in CUBE_DIMENSIONS:
+        if all(isinstance(cube[column].dtype, pd.CategoricalDtype) for cube in cubes):
+            categories = cubes[0][column].cat.categories
+            if any(not cube[column].cat.categories.equals(categories) for cube in cubes):
+                categories = sorted(set().union(*(cube[column].cat.categories for cube in cubes)))
+            combined[column] = pd.Categorical(combined[column], categories=categories)
+    cube = combined.groupby(CUBE_DIMENSIONS, dropna=False, observed=True)[['count', 'mass_mg', 'mass_count']].sum()
+    return _with_mass_sum(cube)
+
+
+# Function to restrict the cube to a range of years (both ends included)
+def between_years(cube: pd.DataFrame, start: int | None = None, end: int | None = None) -> pd.DataFrame:
+    if start is not None:
+        cube = cube[cube['year'] >= start]
+    if end is not None:
+        cube = cube[cube['year'] <= end]
+    return cube
+
+
+# Function to count landings per continent, largest first
+def continent_counts(cube: pd.DataFrame) -> pd.DataFrame:
+    counts = cube.groupby('Continent Name', observed=True)['count'].sum()
+    return counts[counts > 0].sort_values(ascending=False, kind='stable').reset_index()
+
+
+# Function to count landings per country, largest first
+def country_counts(cube: pd.DataFrame, exclude: tuple[str, ...] = (), n: int | None = None) -> pd.Series:
+    counts = cube[~cube['Country Name'].isin(exclude)].groupby('Country Name', observed=True)['count'].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    return counts.head(n) if n else counts
+
+
+# Function to count landings per meteorite class, largest first
+def class_counts(cube: pd.DataFrame, n: int | None = None) -> pd.DataFrame:
+    counts = cube.groupby('recclass', observed=True)['count'].sum().sort_values(ascending=False, kind='stable')
+    return (counts.head(n) if n else counts).reset_index()
+
+
+# Function to get the average mass per meteorite class, heaviest first
+def class_mean_mass(cube: pd.DataFrame, n: int | None = None) -> pd.DataFrame:
+    sums = cube.groupby('recclass', observed=True)[['mass_sum', 'mass_count']].sum()
+    mean = (sums['mass_sum'] / sums['mass_count']).rename('mass (g)').to_frame()
+    mean = mean.sort_values(by='mass (g)', ascending=False, kind='stable')
+    return mean.head(n) if n else mean
+
+
+# Function to count landings per year
+def yearly_counts(cube: pd.DataFrame, start: int | None = None, end: int | None = None) -> pd.DataFrame:
+    counts = between_years(cube, start, end).groupby('year')['count'].sum()
+    return counts.rename('# of Meteorites').to_frame()
+
+
+# Function to get the running total of landings per continent over the years
+def continent_running_totals(cube: pd.DataFrame, start: int | None = None, end: int | None = None) -> pd.DataFrame:
+    yearly = between_years(cube, start, end).groupby(['Continent Name', 'year'], observed=True)['count'].sum().reset_index()
+    yearly['Running Total'] = yearly.groupby('Continent Name', observed=True)['count'].cumsum()
+    return yearly
+
+
+# Function to get the average mass per year
+def yearly_mean_mass(cube: pd.DataFrame, start: int | None = None, end: int | None = None) -> pd.DataFrame:
+    sums = between_years(cube, start, end).groupby('year')[['mass_sum', 'mass_count']].sum()
+    return (sums['mass_sum'] / sums['mass_count']).rename('mass (g)').to_frame()
@@ -0,0 +1,136 @@
+import glob
+import hashlib
+import io
+import json
+import os
+
+import streamlit as st
+from PIL import Image
+
+import perf
+from storage import ARTIFACTS_DIR, file_hash, write_atomic, write_json
+
+ASSETS_DIR = os.path.join(ARTIFACTS_DIR, 'assets')
+MANIFEST_FILE = os.path.join(ASSETS_DIR, 'manifest.json')
+# Bump when the variants below or their encoding change, so stale manifests are rebuilt
+MANIFEST_FORMAT = 1
+
+# Variants generated per source image, as variant name -> width in pixels (None keeps the original size)
+ASSET_VARIANTS = {
+    'screenshots/*.png': {'thumb': 640, 'full': None},
+    # The logo is shown 300px wide on project pages (600px covers high-density screens) and full width on Home/Contact
+    'Logo.png': {'small': 600, 'wide': 1600},
+    'Logo_s.png': {'icon': 128},
+}
+WEBP_QUALITY = 85
+
+
+def _webp(image: Image.Image, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', method=4, **options)
+    return buffer.getvalue()
+
+
+# Flat UI screenshots and logos often compress better losslessly; the smaller encoding is kept
+def _encode(image: Image.Image, width: int | None) -> tuple[bytes, tuple[int, int]]:
+    if width is not None and image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+    return min(_webp(image, quality=WEBP_QUALITY), _webp(image, lossless=True), key=len), image.size
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# Function to write the WebP variants of one source image under content-hashed names
+# (the name changes whenever the bytes do, so browsers and CDNs can cache them for good)
+def build_variants(source: str, variants: dict[str, int | None]) -> dict:
+    with Image.open(source) as image:
+        image.load()
+        entry = {'sha256': file_hash(source), 'size': os.path.getsize(source), 'width': image.width, 'height': image.height, 'variants': {}}
+        stem = os.path.splitext(os.path.basename(source))[0]
+        for name, width in variants.items():
+            data, (variant_width, variant_height) = _encode(image, width)
+            path = os.path.join(ASSETS_DIR, f"{stem}.{name}.{hashlib.sha256(data).hexdigest()[:12]}.webp")
+            if not os.path.exists(path):
+                write_atomic(path, lambda tmp_path: _write_bytes(tmp_path, data))
+            entry['variants'][name] = {'path': path, 'width': variant_width, 'height': variant_height, 'bytes': len(data)}
+    return entry
+
+
+def _read_manifest() -> dict:
+    try:
+        with open(MANIFEST_FILE) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get('assets', {}) if manifest.get('format') == MANIFEST_FORMAT else {}
+
+
+def _is_current(entry: dict | None, source: str, variants: dict) -> bool:
+    if not entry or entry.get('size') != os.path.getsize(source) or set(entry['variants']) != set(variants):
+        return False
+    if not all(os.path.exists(variant['path']) for variant in entry['variants'].values()):
+        return False
+    return entry['sha256'] == file_hash(source)
+
+
+# Function to list the source images with the variants each one gets, in name order per pattern
+def sources() -> list[tuple[str, dict[str, int | None]]]:
+    return [(source.replace(os.sep, '/'), variants) for pattern, variants in ASSET_VARIANTS.items() for source in sorted(glob.glob(pattern))]
+
+
+# Function to bring the asset manifest up to date, regenerating variants only for new or changed images
+def build_manifest() -> dict:
+    known = _read_manifest()
+    assets = {}
+    for source, variants in sources():
+        entry = known.get(source)
+        assets[source] = entry if _is_current(entry, source, variants) else build_variants(source, variants)
+    if assets != known:
+        write_json(MANIFEST_FILE, {'format': MANIFEST_FORMAT, 'assets': assets})
+    return assets
+
+
+# Function to get the asset manifest of this process: every source image (listed once per process),
+# with its stored entry when that is current, or None. Variants are never encoded while serving a page:
+# they are built offline (python assets.py, or bake.py), and images without current variants are served as is.
+@st.cache_resource()
+def asset_manifest() -> dict[str, dict | None]:
+    with perf.startup_phase('load', 'assets'):
+        known = _read_manifest()
+        return {source: known[source] if _is_current(known.get(source), source, variants) else None for source, variants in sources()}
+
+
+# Function to get the file of an image variant (e.g. asset('Logo.png', 'small')), or the source image
+# itself when its variants have not been built
+def asset(source: str, variant: str) -> str:
+    entry = asset_manifest().get(source)
+    return entry['variants'][variant]['path'] if entry else source
+
+
+# Function to list the source images whose path starts with a prefix, in name order (from the manifest, without listing folders)
+def images(prefix: str) -> list[str]:
+    return [source for source in asset_manifest() if source.startswith(prefix)]
+
+
+# Function to show screenshots as thumbnails, loading the full-size image only when one is picked
+def screenshot_gallery(prefix: str, key: str) -> None:
+    sources = images(prefix)
+    captions = [f"Screenshot {i}" for i in range(1, len(sources) + 1)]
+    columns = st.columns(2)
+    for i, (source, caption) in enumerate(zip(sources, captions)):
+        columns[i % 2].image(asset(source, 'thumb'), caption=caption, width='stretch')
+    selected = st.selectbox('View full size', captions, index=None, placeholder='Choose a screenshot', key=key)
+    if selected is not None:
+        st.image(asset(sources[captions.index(selected)], 'full'), width='stretch')
+
+
+if __name__ == '__main__':
+    # Build the variants offline (bake.py does too); until then pages serve the source images
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    manifest = build_manifest()
+    for source, entry in manifest.items():
+        variants = ', '.join(f"{name} {variant['width']}x{variant['height']} {variant['bytes'] / 1024:.0f} KiB" for name, variant in entry['variants'].items())
+        print(f"{source} ({entry['size'] / 1024:.0f} KiB): {variants}")
@@ -0,0 +1,187 @@
+# Offline build of every artifact the app derives from its source files, so that a fresh
+# replica only reads them and is warm from its first request:
+#
+#     python bake.py [--workers N]
+#
+# Jobs that do not depend on each other run in a pool of processes. artifacts/bake.json records
+# the version of every source file and dataset, and what each job built with its timing.
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from storage import ARTIFACTS_DIR, use_app_root, write_json
+
+use_app_root()
+
+import assets
+import charts
+import datasets
+import exports
+import filters
+import summary
+
+BAKE_MANIFEST = os.path.join(ARTIFACTS_DIR, 'bake.json')
+# Bump when the manifest layout changes
+BAKE_FORMAT = 1
+
+# Source files of the three datasets (and the boundaries the landings are located in)
+SOURCE_FILES = (datasets.METEORITES_FILE, datasets.FETAL_HEALTH_FILE, datasets.AGENCY_FILE, datasets.BOUNDARIES_FILE)
+# Datasets with a summary on their page, and the file they are loaded from
+SUMMARY_DATASETS = {
+    'meteorites': datasets.METEORITES_FILE,
+    'fetal_health': datasets.FETAL_HEALTH_FILE,
+    'agency': datasets.AGENCY_FILE,
+}
+# Themes figures are baked for: st.context.theme.type, which is None until the browser reports one
+THEMES = ('light', 'dark', None)
+
+
+def bake_columnar(filename: str) -> dict:
+    df = datasets.read_columnar(filename)
+    return {'rows': len(df), 'artifacts': list(datasets._columnar_paths(filename))}
+
+
+def bake_locator() -> dict:
+    datasets.load_locator()
+    return {}
+
+
+def bake_assets() -> dict:
+    manifest = assets.build_manifest()
+    return {'images': len(manifest), 'artifacts': [assets.MANIFEST_FILE]}
+
+
+def bake_locations() -> dict:
+    located = datasets.locate_meteorites(datasets.load_meteorites())
+    return {'rows': len(located), 'located': int(located['Country Name'].notna().sum())}
+
+
+def bake_proximity() -> dict:
+    datasets.proximity_index(datasets.load_meteorites())
+    return {}
+
+
+def bake_cube() -> dict:
+    cube = datasets.meteorite_cube(datasets.locate_meteorites(datasets.load_meteorites()))
+    return {'cells': len(cube)}
+
+
+def bake_summary(name: str) -> dict:
+    df = datasets.load_meteorites() if name == 'meteorites' else datasets.load_data(SUMMARY_DATASETS[name])
+    table = summary.dataset_summary(df, datasets.dataset_version(name))
+    return {'columns': len(table.columns)}
+
+
+# Exports of the unfiltered landings, as offered by the download button
+def bake_export(fmt: str) -> dict:
+    path = exports.export_file(datasets.load_meteorite_rows(), fmt, 'Meteorite_Landings', datasets.dataset_version('meteorites'))
+    return {'bytes': os.path.getsize(path), 'artifacts': [path]}
+
+
+# Figures of Project 1 with no sidebar filter (the cube charts, and the map at each focus preset's
+# own zoom), under the keys the page looks them up by. Specs of other data versions or chart code are removed.
+def bake_figures() -> dict:
+    df = datasets.load_meteorites()
+    version = datasets.dataset_version('meteorites')
+    cube = datasets.meteorite_cube(datasets.locate_meteorites(df))
+    index = filters.meteorite_index(df, version)
+    year_range = (int(index.sorted_year[0]), int(index.sorted_year[-1]))
+
+    figures = {}
+    for name, build in charts.CUBE_FIGURES.items():
+        figures[(name, ())] = build(cube)
+    for focus, (lat, lon, zoom) in charts.MAP_FOCUS.items():
+        params = charts.map_params(year_range, focus, float(zoom), charts.MAP_MODES[0])
+        figures[('landing_map', tuple(params.items()))] = charts.landing_map(df.iloc[index.query(years=params['years'])], lat, lon, float(zoom), charts.MAP_MODES[0])
+
+    paths = []
+    for (name, params), fig in figures.items():
+        for theme in THEMES:
+            paths.append(charts.write_figure(charts.figure_key(name, version, {}, theme, **dict(params)), fig))
+    for path in glob.glob(os.path.join(charts.FIGURES_DIR, '*.json')):
+        if path not in paths:
+            os.remove(path)
+    return {'figures': len(paths), 'bytes': sum(os.path.getsize(path) for path in paths)}
+
+
+# Jobs as name -> (function, arguments, jobs that must have finished first)
+JOBS = {
+    'columnar:meteorites': (bake_columnar, (datasets.METEORITES_FILE,), ()),
+    'columnar:fetal_health': (bake_columnar, (datasets.FETAL_HEALTH_FILE,), ()),
+    'columnar:agency': (bake_columnar, (datasets.AGENCY_FILE,), ()),
+    'locator': (bake_locator, (), ()),
+    'assets': (bake_assets, (), ()),
+    'locations': (bake_locations, (), ('columnar:meteorites', 'locator')),
+    'proximity': (bake_proximity, (), ('columnar:meteorites',)),
+    'cube': (bake_cube, (), ('locations',)),
+    'figures': (bake_figures, (), ('cube',)),
+    **{f'summary:{name}': (bake_summary, (name,), (f'columnar:{name}',)) for name in SUMMARY_DATASETS},
+    **{f'export:{fmt}': (bake_export, (fmt,), ('columnar:meteorites',)) for fmt in exports.EXPORT_FORMATS},
+}
+
+
+def _run(name: str) -> dict:
+    func, args, _ = JOBS[name]
+    start = time.perf_counter()
+    result = func(*args)
+    return {'status': 'ok', 'ms': round((time.perf_counter() - start) * 1000, 1), **result}
+
+
+# Function to run the jobs in a process pool, each one as soon as the jobs it depends on are done.
+# Jobs depending on a failed one are skipped.
+def bake(workers: int) -> dict:
+    results: dict[str, dict] = {}
+    running = {}
+    with ProcessPoolExecutor(workers) as pool:
+        while len(results) < len(JOBS):
+            for name, (_, _, after) in JOBS.items():
+                if name in results or name in running.values() or not all(job in results for job in after):
+                    continue
+                if any(results[job]['status'] != 'ok' for job in after):
+                    results[name] = {'status': 'skipped'}
+                    print(f"{name}: skipped", flush=True)
+                else:
+                    running[pool.submit(_run, name)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    print(f"{name}: {results[name]['ms']:,.0f} ms", flush=True)
+                except Exception as error:
+                    results[name] = {'status': 'failed', 'error': f"{type(error).__name__}: {error}"}
+                    print(f"{name}: failed ({results[name]['error']})", flush=True)
+    return {name: results[name] for name in JOBS}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Precompute every artifact the app derives from its source files.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes running jobs at a time')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    jobs = bake(max(args.workers, 1))
+    wall_ms = round((time.perf_counter() - start) * 1000, 1)
+    manifest = {
+        'format': BAKE_FORMAT,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'workers': args.workers,
+        'files': {filename: datasets.file_version(filename) for filename in SOURCE_FILES},
+        'datasets': {name: datasets.dataset_version(name) for name in datasets.DATASET_SOURCES},
+        'wall_ms': wall_ms,
+        'jobs': jobs,
+    }
+    write_json(BAKE_MANIFEST, manifest)
+    job_ms = sum(job.get('ms', 0) for job in jobs.values())
+    print(f"Baked {len(jobs)} jobs in {wall_ms / 1000:.1f} s ({job_ms / 1000:.1f} s of work); manifest in {BAKE_MANIFEST}")
+    if any(job['status'] != 'ok' for job in jobs.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# Benchmark of the meteorite data path (load, preprocess, aggregations, figures, CSV export)
+# on synthetic tables of increasing size. Runs offline, without a Streamlit server:
+#
+#     python -m benchmarks.run [--sizes 45000 450000 4500000] [--repeat 3] [--baseline RESULTS.json]
+#
+# Each run is saved under artifacts/benchmarks/results and compared with the previous one.
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+from storage import ARTIFACTS_DIR, use_app_root, write_json
+
+use_app_root()
+
+import numpy as np
+import pandas as pd
+import plotly
+import streamlit as st
+
+import aggregates
+import charts
+import datasets
+import exports
+from benchmarks.synthetic import synthetic_csv
+
+RESULTS_DIR = os.path.join(ARTIFACTS_DIR, 'benchmarks', 'results')
+SIZES = (45_000, 450_000, 4_500_000)
+REPEAT = 3
+
+AGGREGATIONS = {
+    'continent_counts': aggregates.continent_counts,
+    'country_counts': lambda cube: aggregates.country_counts(cube, exclude=("Antarctica",), n=10),
+    'class_counts': lambda cube: aggregates.class_counts(cube, n=15),
+    'class_mean_mass': lambda cube: aggregates.class_mean_mass(cube, n=20),
+    'yearly_counts': lambda cube: aggregates.yearly_counts(cube, 1970, 2013),
+    'continent_running_totals': lambda cube: aggregates.continent_running_totals(cube, 1970, 2013),
+    'yearly_mean_mass': lambda cube: aggregates.yearly_mean_mass(cube, 1980, 2013),
+}
+
+FIGURES = charts.CUBE_FIGURES
+
+
+# Function to time a callable, running setup (untimed) before every run
+def measure(func, repeat: int = REPEAT, setup=None) -> dict:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'min_ms': round(min(times), 2), 'median_ms': round(statistics.median(times), 2), 'runs': len(times)}
+
+
+def _clear_caches() -> None:
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _remove_artifacts(pattern: str) -> None:
+    for path in glob.glob(pattern):
+        os.remove(path)
+
+
+# Function to benchmark the data path of the app on one meteorite file
+def bench_file(path: str, repeat: int = REPEAT) -> dict:
+    version = datasets.file_version(path)
+    arrow_path, meta_path = datasets._columnar_paths(path)
+    locations = os.path.join(datasets.LOCATIONS_DIR, f"locations-v*-{version}-*.arrow")
+    cubes = os.path.join(datasets.CUBES_DIR, f"cube-v*-{version}-*.arrow")
+    results = {}
+
+    # Cold: parse the CSV and write the columnar copy; warm: memory-map the columnar copy
+    results['load_data (cold)'] = measure(lambda: datasets.load_data(path), repeat, setup=lambda: (_clear_caches(), _remove_artifacts(arrow_path), _remove_artifacts(meta_path)))
+    results['load_data (warm)'] = measure(lambda: datasets.load_data(path), repeat, setup=_clear_caches)
+    results['load_meteorites'] = measure(lambda: datasets.load_meteorites(path), repeat, setup=_clear_caches)
+    df = datasets.load_meteorites(path)
+
+    # Cold: locate every landing in the boundaries; warm: read the stored locations
+    results['preprocess_data (cold)'] = measure(lambda: datasets.preprocess_data(df, path), repeat, setup=lambda: (_clear_caches(), _remove_artifacts(locations)))
+    results['preprocess_data (warm)'] = measure(lambda: datasets.preprocess_data(df, path), repeat, setup=_clear_caches)
+    results['locate_meteorites'] = measure(lambda: datasets.locate_meteorites(df, path), repeat, setup=_clear_caches)
+    located = datasets.locate_meteorites(df, path)
+    # Cold: roll the located landings up into the cube; warm: read the stored cube
+    results['meteorite_cube (cold)'] = measure(lambda: datasets.meteorite_cube(located, path), repeat, setup=lambda: (_clear_caches(), _remove_artifacts(cubes)))
+    results['meteorite_cube (warm)'] = measure(lambda: datasets.meteorite_cube(located, path), repeat, setup=_clear_caches)
+    cube = datasets.meteorite_cube(located, path)
+
+    for name, aggregate in AGGREGATIONS.items():
+        results[f'aggregate:{name}'] = measure(lambda: aggregate(cube), repeat)
+    for name, build in FIGURES.items():
+        results[f'figure:{name}'] = measure(lambda: build(cube), repeat)
+    results['figure:landing_map'] = measure(lambda: charts.landing_map(df), repeat)
+
+    # Out-of-core path: cube and summary from the file in chunks, on every core
+    results['stream_meteorites'] = measure(lambda: datasets.stream_meteorites(path, workers=os.cpu_count() or 1), repeat)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, 'export.csv')
+        # Exports are written from the rows as typed in the source, like the download button's
+        rows = datasets.load_meteorite_rows(path)
+        results['export:csv'] = measure(lambda: exports.write_export(rows, export_path, 'CSV'), repeat)
+        results['export:csv']['bytes'] = os.path.getsize(export_path)
+    return results
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+    }
+
+
+# Function to find the most recent saved results (the default baseline for comparisons)
+def latest_results(exclude: str | None = None) -> str | None:
+    paths = sorted(path for path in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if path != exclude)
+    return paths[-1] if paths else None
+
+
+# Function to print each stage's median time next to a baseline run, with the ratio
+def compare(current: dict, baseline: dict) -> None:
+    print(f"\n{'rows':>10} {'stage':<34} {'median ms':>10} {'baseline':>10} {'ratio':>7}")
+    for size, stages in current['results'].items():
+        for stage, result in stages.items():
+            before = baseline['results'].get(size, {}).get(stage)
+            if before is None:
+                print(f"{size:>10} {stage:<34} {result['median_ms']:>10.1f} {'-':>10} {'-':>7}")
+            else:
+                print(f"{size:>10} {stage:<34} {result['median_ms']:>10.1f} {before['median_ms']:>10.1f} {result['median_ms'] / max(before['median_ms'], 1e-3):>6.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the meteorite data path on synthetic tables of increasing size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='row counts of the synthetic tables')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='runs per stage (the median is reported)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic tables')
+    parser.add_argument('--output', help='results file (default: a timestamped file in artifacts/benchmarks/results)')
+    parser.add_argument('--baseline', help='results file to compare with (default: the latest saved run)')
+    args = parser.parse_args()
+
+    run = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': _environment(), 'repeat': args.repeat, 'seed': args.seed, 'results': {}}
+    for rows in args.sizes:
+        print(f"{rows:,} rows: generating", flush=True)
+        path = synthetic_csv(rows, args.seed)
+        print(f"{rows:,} rows: running", flush=True)
+        run['results'][str(rows)] = bench_file(path, args.repeat)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    baseline_path = args.baseline or latest_results(exclude=output)
+    write_json(output, run)
+    print(f"Saved {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"Baseline {baseline_path} ({baseline['environment'].get('commit')})")
+        compare(run, baseline)
+    else:
+        compare(run, {'results': {}})
+
+
+if __name__ == '__main__':
+    main()
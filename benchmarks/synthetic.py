@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from datasets import METEORITES_FILE, file_version
+from storage import ARTIFACTS_DIR, write_atomic
+
+SYNTHETIC_DIR = os.path.join(ARTIFACTS_DIR, 'benchmarks', 'data')
+# Bump when the generated rows change, so older synthetic files are not reused
+GENERATOR_VERSION = 1
+
+# Standard deviation of the jitter added to resampled coordinates (degrees) and log-masses
+POSITION_JITTER = 0.5
+MASS_JITTER = 0.3
+
+
+# Function to generate a synthetic meteorite table with the schema of the real one.
+# Rows are resampled from the real landings (so classes, years, falls and missing values
+# keep their real mix) with jittered positions and masses and fresh ids and names.
+def synthetic_meteorites(rows: int, seed: int = 0, source: str = METEORITES_FILE) -> pd.DataFrame:
+    real = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    sample = real.iloc[rng.integers(0, len(real), rows)].reset_index(drop=True)
+
+    # (0, 0) marks an unknown position in the real data and is kept as is
+    unknown = (sample['reclat'] == 0) & (sample['reclong'] == 0)
+    lat = (sample['reclat'] + rng.normal(0, POSITION_JITTER, rows)).clip(-90, 90).round(6).mask(unknown, 0.0)
+    lon = ((sample['reclong'] + rng.normal(0, POSITION_JITTER, rows) + 180) % 360 - 180).round(6).mask(unknown, 0.0)
+    mass = (sample['mass (g)'] * np.exp(rng.normal(0, MASS_JITTER, rows))).round(2)
+    ids = np.arange(1, rows + 1)
+    geolocation = ('(' + lat.astype(str) + ', ' + lon.astype(str) + ')').where(lat.notna() & lon.notna())
+
+    return pd.DataFrame({
+        'name': 'Synthetic ' + pd.Series(ids).astype(str),
+        'id': ids,
+        'nametype': sample['nametype'],
+        'recclass': sample['recclass'],
+        'mass (g)': mass,
+        'fall': sample['fall'],
+        'year': sample['year'].astype('Int64'),
+        'reclat': lat,
+        'reclong': lon,
+        'GeoLocation': geolocation,
+    })
+
+
+# Function to get the CSV of a synthetic table, generating it on first use.
+# Files are keyed by row count, seed, generator version and the real data they resample.
+def synthetic_csv(rows: int, seed: int = 0, source: str = METEORITES_FILE) -> str:
+    path = os.path.join(SYNTHETIC_DIR, f"meteorites-{rows}-s{seed}-v{GENERATOR_VERSION}-{file_version(source)}.csv")
+    if not os.path.exists(path):
+        df = synthetic_meteorites(rows, seed, source)
+        write_atomic(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+    return path
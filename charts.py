@@ -0,0 +1,443 @@
+import base64
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+import plotly.graph_objs as go
+import streamlit as st
+
+import aggregates
+import perf
+from storage import ARTIFACTS_DIR, write_atomic
+
+# Map size in pixels, as laid out on the Project 1 page
+MAP_WIDTH = 1100
+MAP_HEIGHT = 1000
+
+# Raw landings are only sent when at most this many are visible; above it they are binned
+RAW_POINTS_LIMIT = 5000
+# Target size of a grid cell on screen, in pixels
+BIN_PIXELS = 16
+# Latitude at the top and bottom edges of the Web Mercator world
+MERCATOR_MAX_LAT = 85.0511287798066
+
+MAP_MODES = ('Auto', 'Grid', 'Density', 'Points')
+# Map focus presets as (lat, lon, zoom); the first one is the default
+MAP_FOCUS = {
+    'World': (0, 0, 0),
+    'Africa': (5, 20, 2),
+    'Antarctica': (-78, 0, 1.5),
+    'Asia': (35, 90, 2),
+    'Europe': (50, 15, 3),
+    'North America': (45, -100, 2),
+    'Oceania': (-25, 135, 2.5),
+    'South America': (-20, -60, 2),
+    'Oman': (20, 56, 5),
+}
+# Years the map shows at most, within the sidebar year filter
+MAP_YEARS = (1900, 2019)
+
+# Memory cap for the serialized figures kept across reruns and sessions
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+# Figure specs baked ahead of time by bake.py
+FIGURES_DIR = os.path.join(ARTIFACTS_DIR, 'figures')
+# Bump when figures change in a way the chart code does not show (the code itself is hashed below)
+FIGURE_FORMAT = 1
+
+
+# Function to get a short id of the code figures are built with (this module, the roll-ups and plotly),
+# so stored specs from other code are never served
+def _figure_code_version() -> str:
+    digest = hashlib.sha256(plotly.__version__.encode())
+    for module in (__file__, aggregates.__file__):
+        with open(module, 'rb') as f:
+            digest.update(f.read())
+    return f"v{FIGURE_FORMAT}.{digest.hexdigest()[:8]}"
+
+
+FIGURE_VERSION = _figure_code_version()
+
+
+# Function to get the degrees of longitude covered by one pixel at a zoom level (512px tiles)
+def degrees_per_pixel(zoom: float) -> float:
+    return 360 / (512 * 2 ** zoom)
+
+
+# Function to get the Web Mercator y of a latitude, in pixels from the top of a world size pixels tall
+def mercator_y(lat: float, size: float) -> float:
+    lat = np.radians(np.clip(lat, -MERCATOR_MAX_LAT, MERCATOR_MAX_LAT))
+    return (1 - np.log(np.tan(np.pi / 4 + lat / 2)) / np.pi) / 2 * size
+
+
+# Function to get the latitude at a Web Mercator y (the inverse of mercator_y)
+def mercator_lat(y: float, size: float) -> float:
+    return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / size)))))
+
+
+# Function to get the (lat_min, lat_max, lon_min, lon_max) box shown around a centre at a zoom level.
+# Latitudes come from the pixel rows above and below the centre on the Web Mercator world
+# (512 * 2**zoom pixels tall); a box reaching the top or bottom of the world extends to the pole.
+def viewport(lat: float, lon: float, zoom: float, width: int = MAP_WIDTH, height: int = MAP_HEIGHT) -> tuple[float, float, float, float]:
+    half_lon = width * degrees_per_pixel(zoom) / 2
+    if half_lon >= 180:
+        lon_min, lon_max = -180.0, 180.0
+    else:
+        lon_min, lon_max = lon - half_lon, lon + half_lon
+    size = 512 * 2 ** zoom
+    y = mercator_y(lat, size)
+    top, bottom = y - height / 2, y + height / 2
+    lat_max = 90.0 if top <= 0 else mercator_lat(top, size)
+    lat_min = -90.0 if bottom >= size else mercator_lat(bottom, size)
+    return lat_min, lat_max, lon_min, lon_max
+
+
+# Function to select the landings inside a viewport (handles boxes crossing the antimeridian)
+def in_viewport(df: pd.DataFrame, box: tuple[float, float, float, float]) -> pd.DataFrame:
+    lat_min, lat_max, lon_min, lon_max = box
+    lon = df['reclong'].to_numpy()
+    lon = np.where(lon < lon_min, lon + 360, np.where(lon > lon_max, lon - 360, lon))
+    mask = (df['reclat'].to_numpy() >= lat_min) & (df['reclat'].to_numpy() <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    return df[mask]
+
+
+# Function to aggregate landings into square grid cells of the given size in degrees
+def bin_landings(df: pd.DataFrame, cell: float) -> pd.DataFrame:
+    ix = np.floor(df['reclong'].to_numpy() / cell).astype(np.int64)
+    iy = np.floor(df['reclat'].to_numpy() / cell).astype(np.int64)
+    binned = pd.DataFrame({
+        'key': iy * (int(360 / cell) + 2) + ix,
+        'reclat': df['reclat'].to_numpy(),
+        'reclong': df['reclong'].to_numpy(),
+        'year': df['year'].to_numpy(),
+        'mass (g)': df['mass (g)'].to_numpy(),
+    }).groupby('key')
+    cells = binned.agg(reclat=('reclat', 'mean'), reclong=('reclong', 'mean'), count=('year', 'size'), year=('year', 'mean'), mass=('mass (g)', 'mean'))
+    return cells.reset_index(drop=True)
+
+
+def _layout(fig: go.Figure, lat: float, lon: float, zoom: float) -> go.Figure:
+    fig.update_layout(
+        map_style="open-street-map",
+        map=dict(center=dict(lat=lat, lon=lon), zoom=zoom),
+        margin=dict(l=0, r=0, t=0, b=0),
+        width=MAP_WIDTH, height=MAP_HEIGHT)
+    return fig
+
+
+# Function to build the landing distribution map at a level of detail matching the zoom.
+# Raw points are sent when few are visible; otherwise landings are binned on the server into
+# grid cells (or a density layer) sized to the zoom, keeping the figure small at any data size.
+def landing_map(df: pd.DataFrame, lat: float = 0, lon: float = 0, zoom: float = 0, mode: str = 'Auto') -> go.Figure:
+    visible = in_viewport(df, viewport(lat, lon, zoom))
+    if mode == 'Points' or (mode == 'Auto' and len(visible) <= RAW_POINTS_LIMIT):
+        fig = go.Figure(go.Scattermap(
+            lat=visible['reclat'], lon=visible['reclong'], mode='markers',
+            marker=dict(color=visible['year'], colorscale='Viridis', showscale=True, colorbar=dict(title='year')),
+            text=visible['recclass'], customdata=visible[['year', 'mass (g)']],
+            hovertemplate="<b>%{text}</b><br>year=%{customdata[0]:.0f}<br>mass (g)=%{customdata[1]}<extra></extra>",
+        ))
+        return _layout(fig, lat, lon, zoom)
+
+    cells = bin_landings(visible, BIN_PIXELS * degrees_per_pixel(zoom))
+    if mode == 'Density':
+        fig = go.Figure(go.Densitymap(
+            lat=cells['reclat'], lon=cells['reclong'], z=cells['count'], radius=BIN_PIXELS,
+            colorscale='Viridis', colorbar=dict(title='landings'),
+            hovertemplate="landings=%{z}<extra></extra>",
+        ))
+    else:
+        fig = go.Figure(go.Scattermap(
+            lat=cells['reclat'], lon=cells['reclong'], mode='markers',
+            marker=dict(size=np.clip(4 + 3 * np.log2(cells['count']), 4, 30), color=cells['year'], colorscale='Viridis', showscale=True, colorbar=dict(title='mean year')),
+            customdata=cells[['count', 'year', 'mass']],
+            hovertemplate="landings=%{customdata[0]}<br>mean year=%{customdata[1]:.0f}<br>mean mass (g)=%{customdata[2]:.0f}<extra></extra>",
+        ))
+    return _layout(fig, lat, lon, zoom)
+
+
+# Function to get the map parameters (as keyed in the figure cache) for a year filter, focus preset, zoom and detail mode
+def map_params(year_range: tuple[int, int], focus: str, zoom: float, mode: str) -> dict:
+    lat, lon, _ = MAP_FOCUS[focus]
+    years = (max(year_range[0], MAP_YEARS[0]), min(year_range[1], MAP_YEARS[1]))
+    return dict(years=years, lat=lat, lon=lon, zoom=zoom, mode=mode)
+
+
+# Function to build the share of landings per continent (pie)
+def continent_pie(cube: pd.DataFrame) -> go.Figure:
+    continents = aggregates.continent_counts(cube)
+    total_meteorites = continents['count'].sum()
+    # Convert 'Count' column to numeric values
+    continents['count'] = pd.to_numeric(continents['count'])
+
+    continents['Percentage'] = 100 * continents['count'] / total_meteorites
+
+    return px.pie(continents, values="Percentage", names="Continent Name", title="<b>Meteorites Per Continent</b>",
+                  color_discrete_sequence=px.colors.qualitative.Set2,
+                  labels={'Percentage': 'Percentage of Meteorites'},
+                  hole=0.5)
+
+
+# Function to read a trace array, decoding the typed-array form figures are stored in as JSON
+def _trace_array(value) -> np.ndarray:
+    if isinstance(value, dict) and 'bdata' in value:
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']))
+    return np.asarray(value)
+
+
+# Function to get the percentage a pie figure shows for one of its labels (None when absent)
+def pie_share(fig: go.Figure, label: str) -> float | None:
+    shares = dict(zip(_trace_array(fig.data[0].labels), _trace_array(fig.data[0].values)))
+    return float(shares[label]) if label in shares else None
+
+
+# Function to build the landings per country bars (excluding Antarctica)
+def country_bars(cube: pd.DataFrame) -> go.Figure:
+    countries = aggregates.country_counts(cube, exclude=("Antarctica",), n=10)
+
+    # Create figure
+    fig = go.Figure()
+
+    # Add bars
+    fig.add_trace(go.Bar(
+        x=countries.index,
+        y=countries,
+        text=countries,
+        textposition="auto",
+        marker=dict(
+            color=countries,
+            colorscale="Viridis",
+            opacity=0.8
+        )
+    ))
+
+    # Update layout
+    fig.update_layout(
+        title="<b>Meteorites Per Country (excluding Antarctica)</b>",
+        xaxis=dict(title="Country"),
+        yaxis=dict(title="Number of Meteorites"),
+        plot_bgcolor="rgba(0,0,0,0)",
+        showlegend=False
+    )
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=False, visible=False)
+    return fig
+
+
+# Function to build the landings per meteorite class bars
+def class_count_bars(cube: pd.DataFrame) -> go.Figure:
+    top_classes = aggregates.class_counts(cube, n=15)
+    fig = px.bar(top_classes, y="count", x="recclass", title="<b>Meteorite Classes</b>", text="recclass", height=500)
+    fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", xaxis=dict(showgrid=False), yaxis=dict(showgrid=False), barmode="stack", legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=-0.2,
+        xanchor="center",
+        x=0.5
+    ))
+    fig.update_traces(marker_color=['#B2DBE5' if y < 5000 else '#F2A694' for y in top_classes['count']])
+    return fig
+
+
+# Function to build the average mass per meteorite class bars
+def class_mass_bars(cube: pd.DataFrame) -> go.Figure:
+    dff = aggregates.class_mean_mass(cube, n=20)
+    dff["mass (g)"] = dff["mass (g)"].round()
+    fig = px.bar(dff.sort_values(by='mass (g)', ascending=False), y="mass (g)", x=dff.index, title="<b>Meteorite Average Mass (g)</b>", text="mass (g)", height=500)
+    fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", xaxis=dict(showgrid=False), yaxis=dict(showgrid=False, title="Average Mass (g)"), barmode="stack")
+    fig.update_traces(marker_color=['#E6A0C4' if y > 1000000 else '#B39EB5' for y in dff['mass (g)']])
+    return fig
+
+
+# Function to build the yearly landings line
+def yearly_landings_line(cube: pd.DataFrame, start: int = 1970, end: int = 2013) -> go.Figure:
+    df_yearly = aggregates.yearly_counts(cube, start, end)
+
+    # Set a new color palette
+    colors = ["#1f77b4"]
+    fig = px.line(df_yearly, x=df_yearly.index, y='# of Meteorites', markers=True, title="<b>Yearly Meteorite Landings</b>", color_discrete_sequence=colors)
+
+    fig.update_yaxes(title_text="# of Meteorites")
+    fig.update_layout(plot_bgcolor="rgba(0,0,0,0)")
+    return fig
+
+
+# Function to build the running total of landings per continent (area)
+def continent_area(cube: pd.DataFrame, start: int = 1970, end: int = 2013) -> go.Figure:
+    yearly_counts = aggregates.continent_running_totals(cube, start, end)
+
+    colors = px.colors.qualitative.Safe
+
+    fig = go.Figure()
+    for i, (continent, totals) in enumerate(yearly_counts.groupby('Continent Name', observed=True)):
+        fig.add_trace(go.Scatter(
+            x=totals['year'],
+            y=totals['Running Total'],
+            name=continent,
+            mode='lines',
+            line=dict(color=colors[i], width=2),
+            fill='tozeroy',
+            hovertemplate="Year: %{x}<br>Running Total: %{y:.0f}"
+        ))
+    fig.update_layout(
+        title="<b>Yearly Landings per Continent</b>",
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(title="Year", showgrid=False),
+        yaxis=dict(title="Running Total"),
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
+        transition=dict(duration=500, easing="linear")
+    )
+    return fig
+
+
+# Function to build the yearly average mass bars, with the average over the period as a dotted line
+def yearly_mass_bars(cube: pd.DataFrame, start: int = 1980, end: int = 2013) -> go.Figure:
+    df_mass = aggregates.yearly_mean_mass(cube, start, end).sort_values(by='mass (g)', ascending=False)
+    avg_mass = df_mass['mass (g)'].mean()
+    df_mass["mass (g)"] = df_mass["mass (g)"].round()
+    fig = px.bar(df_mass.sort_values(by='mass (g)', ascending=False), y="mass (g)", x=df_mass.index, title=f"Yearly Average Mass of Meteorites ({start}-{end})", labels={"x": "Year", "mass (g)": "Average Mass (g)"},
+                 text="mass (g)", height=500)
+
+    fig.add_shape(type="line", x0=df_mass.index.min(), y0=avg_mass, x1=df_mass.index.max(), y1=avg_mass, line=dict(color="gray", width=2, dash="dot"))
+
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(showgrid=False, tickmode='linear'),
+        yaxis=dict(showgrid=False, visible=False),
+        barmode="stack",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.1,
+            xanchor="right",
+            x=1
+        ),
+        font=dict(
+            family="Arial",
+            size=14
+        )
+    )
+
+    fig.update_traces(
+        marker_color=px.colors.sequential.Blues[::-1],
+    )
+    return fig
+
+
+# Project 1 charts drawn from the meteorite cube, by figure cache name
+CUBE_FIGURES = {
+    'continent_pie': continent_pie,
+    'country_bars': country_bars,
+    'class_count_bars': class_count_bars,
+    'class_mass_bars': class_mass_bars,
+    'yearly_landings_line': yearly_landings_line,
+    'continent_area': continent_area,
+    'yearly_mass_bars': yearly_mass_bars,
+}
+
+
+# Serialized figures shared by all sessions, evicting the least recently used past a memory cap.
+# A figure is rebuilt only when its key (dataset version, filters, theme, parameters) is new,
+# so reruns that leave a chart's inputs alone just replay its stored JSON.
+class FigureCache:
+    def __init__(self, max_bytes: int = FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.specs: OrderedDict[str, str] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            spec = self.specs.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self.specs.move_to_end(key)
+            self.hits += 1
+            return spec
+
+    def put(self, key: str, spec: str) -> None:
+        # Figures larger than the whole cache are not kept
+        if len(spec) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.specs:
+                self.size -= len(self.specs.pop(key))
+            self.specs[key] = spec
+            self.size += len(spec)
+            while self.size > self.max_bytes:
+                _, evicted = self.specs.popitem(last=False)
+                self.size -= len(evicted)
+
+    # Function to add the specs stored in a folder (as written by write_figure) for the current chart code, keyed by file name
+    def load(self, directory: str) -> None:
+        for path in sorted(glob.glob(os.path.join(directory, f"*-{FIGURE_VERSION}-*.json"))):
+            with open(path) as f:
+                self.put(os.path.splitext(os.path.basename(path))[0], f.read())
+
+    # Function to get a cached figure and the size of its spec, building and storing it on a miss
+    def lookup(self, key: str, build: Callable[[], go.Figure]) -> tuple[go.Figure, int]:
+        spec = self.get(key)
+        if spec is None:
+            perf.cache_miss()
+            fig = build()
+            spec = fig.to_json()
+            self.put(key, spec)
+            return fig, len(spec)
+        # The spec was validated when it was first built, so it is not validated again
+        return go.Figure(json.loads(spec), _validate=False), len(spec)
+
+    # Function to get a cached figure, building and storing it on a miss
+    def figure(self, key: str, build: Callable[[], go.Figure]) -> go.Figure:
+        return self.lookup(key, build)[0]
+
+
+# Function to get the figure cache shared by all sessions, starting from the baked figure specs
+@st.cache_resource()
+def figure_cache() -> FigureCache:
+    cache = FigureCache()
+    cache.load(FIGURES_DIR)
+    return cache
+
+
+# Function to store the spec of a figure under its cache key, for figure_cache to start from
+def write_figure(key: str, fig: go.Figure) -> str:
+    path = os.path.join(FIGURES_DIR, f"{key}.json")
+    spec = fig.to_json()
+
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, 'w') as f:
+            f.write(spec)
+
+    write_atomic(path, write)
+    return path
+
+
+# Function to get the cache key of a figure for a data version, view (e.g. filters), theme and parameters
+# (and the chart code, see FIGURE_VERSION)
+def figure_key(name: str, version: str, view: dict | None = None, theme: str | None = None, **params) -> str:
+    spec = json.dumps({'view': view or {}, 'theme': theme, 'params': params}, sort_keys=True, default=str)
+    return f"{name}-{version}-{FIGURE_VERSION}-{hashlib.sha256(spec.encode()).hexdigest()[:16]}"
+
+
+# Function to draw a figure from the figure cache in a container (st or a column) and return it.
+# The lookup (and build on a miss) and the st.plotly_chart call are timed as separate sections,
+# the latter with the size of the figure spec sent to the browser.
+def show_figure(container, name: str, build: Callable[[], go.Figure], version: str, view: dict | None = None, theme: str | None = None,
+                params: dict | None = None, **chart_kwargs) -> go.Figure:
+    with perf.section(f'figure:{name}', cached=True) as record:
+        fig, spec_bytes = figure_cache().lookup(figure_key(name, version, view, theme, **(params or {})), build)
+        record['bytes'] = spec_bytes
+    with perf.section(f'plotly_chart:{name}') as record:
+        record['bytes'] = spec_bytes
+        container.plotly_chart(fig, **chart_kwargs)
+    return fig
@@ -0,0 +1,505 @@
+import functools
+import inspect
+import json
+import os
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+import perf
+from aggregates import CUBE_COLUMNS, build_cube, merge_cubes
+from spatial import BORDER, INSIDE, INVALID, LOCATOR_FORMAT, OCEAN, PROXIMITY_FORMAT, CountryLocator, ProximityIndex
+from storage import ARTIFACTS_DIR, file_hash, write_atomic, write_json
+from summary import SUMMARY_CHUNK_ROWS, rechunk, summarize_chunks
+
+COLUMNAR_DIR = os.path.join(ARTIFACTS_DIR, 'columnar')
+
+LOCATIONS_DIR = os.path.join(ARTIFACTS_DIR, 'locations')
+LOCATOR_DIR = os.path.join(ARTIFACTS_DIR, 'locator')
+PROXIMITY_DIR = os.path.join(ARTIFACTS_DIR, 'proximity')
+CUBES_DIR = os.path.join(ARTIFACTS_DIR, 'cubes')
+
+# Country boundaries bundled with the app (Natural Earth 1:110m, formerly geopandas' naturalearth_lowres)
+BOUNDARIES_FILE = os.path.join('data', 'naturalearth_lowres.geojson')
+METEORITES_FILE = "Meteorite_Landings(1).csv"
+FETAL_HEALTH_FILE = "fetal_health.csv"
+AGENCY_FILE = "Agency (G).xlsx"
+
+# Bump when the columnar cache layout changes so old files get rebuilt
+COLUMNAR_FORMAT = 1
+# Bump when the way meteorite locations are computed changes
+LOCATIONS_FORMAT = 3
+# Bump when the columns or aggregation of the meteorite cube change
+CUBE_FORMAT = 1
+
+# Compact dtypes for the meteorite landings once rows with missing values are dropped
+METEORITE_DTYPES = {
+    'id': 'int32',
+    'nametype': 'category',
+    'recclass': 'category',
+    'fall': 'category',
+    'year': 'int16',
+    'reclat': 'float32',
+    'reclong': 'float32',
+}
+
+# Rows read at a time by stream_meteorites, and partial cubes it holds before folding them together
+STREAM_CHUNK_ROWS = SUMMARY_CHUNK_ROWS
+STREAM_PENDING_CUBES = 16
+
+# Labels for the spatial.locate status codes
+LOCATION_STATUS = {INSIDE: 'inside', OCEAN: 'ocean', BORDER: 'border', INVALID: 'invalid'}
+
+
+READ_ONLY_MESSAGE = "Shared datasets are read-only; call .copy() before modifying them"
+
+
+class _ReadOnlyIndexer:
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __call__(self, *args, **kwargs):
+        return _ReadOnlyIndexer(self._indexer(*args, **kwargs))
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        raise TypeError(READ_ONLY_MESSAGE)
+
+
+# Function to wrap a DataFrame method taking `inplace` so that inplace=True raises before
+# the method runs (pandas writes into the blocks before it swaps in the result)
+def _without_inplace(method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if kwargs.get('inplace'):
+            raise TypeError(READ_ONLY_MESSAGE)
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+# Data frame held once per process and shared by every session.
+# Writes raise before touching the data other sessions see; anything derived
+# from it (filters, copies, aggregations) is an ordinary DataFrame.
+class SharedFrame(pd.DataFrame):
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(READ_ONLY_MESSAGE)
+
+    __setitem__ = __delitem__ = insert = update = _set_value = _set_axis = _update_inplace = _read_only
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(super().loc)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(super().iloc)
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(super().at)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(super().iat)
+
+
+# Every public method with an `inplace` argument (fillna, replace, where, mask, interpolate, ffill, ...)
+for _name, _method in inspect.getmembers(pd.DataFrame, inspect.isfunction):
+    if not _name.startswith('_') and 'inplace' in inspect.signature(_method).parameters:
+        setattr(SharedFrame, _name, _without_inplace(_method))
+
+
+# Function to wrap a data frame for sharing between sessions without copying it
+def share(df: pd.DataFrame) -> SharedFrame:
+    return SharedFrame(df, copy=False)
+
+
+# Function to fingerprint a file by path, size, mtime and content hash.
+# The hash is only recomputed when size or mtime differ from the known fingerprint.
+def file_fingerprint(filename: str, known: dict | None = None) -> dict:
+    stat = os.stat(filename)
+    fingerprint = {'path': os.path.abspath(filename), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if known and all(known.get(key) == value for key, value in fingerprint.items()) and 'sha256' in known:
+        fingerprint['sha256'] = known['sha256']
+    else:
+        fingerprint['sha256'] = file_hash(filename)
+    _file_versions[(fingerprint['path'], stat.st_size, stat.st_mtime_ns)] = fingerprint['sha256'][:16]
+    return fingerprint
+
+
+# Short content versions by (path, size, mtime_ns), filled by file_fingerprint
+_file_versions: dict[tuple, str] = {}
+
+
+# Function to get a short version id for a file's content. It costs one stat per call: the hash
+# is computed once per path/size/mtime, or taken from the columnar copy's metadata when that
+# fingerprint still matches (so a new process does not re-hash an unchanged source).
+def file_version(filename: str) -> str:
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_versions:
+        file_fingerprint(filename, _known_fingerprint(filename))
+    return _file_versions[key]
+
+
+# Function to write a data frame as an Arrow IPC file
+def write_frame(path: str, df: pd.DataFrame) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    def write(tmp_path: str) -> None:
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    write_atomic(path, write)
+
+
+# Function to read an Arrow IPC file through a memory map. Numeric columns without nulls and string
+# columns stay backed by the map (shared by every process reading the file); numeric columns with
+# nulls are filled with NaN in a copy.
+def read_frame(path: str) -> pd.DataFrame:
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+# Function to parse a source file
+def read_source(filename: str) -> pd.DataFrame:
+    if filename.endswith(".csv"):
+        df = pd.read_csv(filename)
+    elif filename.endswith(".xlsx"):
+        df = pd.read_excel(filename)
+    else:
+        raise ValueError(f"Unsupported file type: {filename}")
+    return df
+
+
+def _columnar_paths(filename: str) -> tuple[str, str]:
+    base = os.path.join(COLUMNAR_DIR, os.path.basename(filename))
+    return f"{base}.arrow", f"{base}.json"
+
+
+def _read_meta(meta_path: str) -> dict | None:
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path: str, fingerprint: dict) -> None:
+    write_json(meta_path, {'format': COLUMNAR_FORMAT, 'source': fingerprint})
+
+
+# Function to get the fingerprint stored with the columnar copy of a file, if any
+def _known_fingerprint(filename: str) -> dict | None:
+    meta = _read_meta(_columnar_paths(filename)[1])
+    return meta.get('source') if meta and meta.get('format') == COLUMNAR_FORMAT else None
+
+
+# Function to convert a source file into a typed, memory-mappable Arrow file
+def build_columnar(filename: str, fingerprint: dict) -> pd.DataFrame:
+    arrow_path, meta_path = _columnar_paths(filename)
+    df = read_source(filename)
+    try:
+        write_frame(arrow_path, df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Columns Arrow cannot type (e.g. mixed objects) are served straight from the parse
+        return df
+    _write_meta(meta_path, fingerprint)
+    return df
+
+
+# Function to read the columnar copy of a source file, rebuilding it when stale
+def read_columnar(filename: str) -> pd.DataFrame:
+    arrow_path, meta_path = _columnar_paths(filename)
+    known = _known_fingerprint(filename)
+    fingerprint = file_fingerprint(filename, known)
+    if known is None or known['sha256'] != fingerprint['sha256'] or not os.path.exists(arrow_path):
+        return build_columnar(filename, fingerprint)
+    if known != fingerprint:
+        # Same content with a new mtime (e.g. a fresh checkout): refresh the fingerprint only
+        _write_meta(meta_path, fingerprint)
+    return read_frame(arrow_path)
+
+
+@st.cache_resource()
+def _load_data(filename: str, version: str) -> SharedFrame:
+    perf.cache_miss()
+    return share(read_columnar(filename))
+
+
+# Function to load data
+@perf.timed('load_data', cached=True)
+def load_data(filename: str) -> pd.DataFrame:
+    return _load_data(filename, file_version(filename))
+
+
+# Function to load the prebuilt country locator, building it on first use
+def load_locator() -> CountryLocator:
+    path = os.path.join(LOCATOR_DIR, f"locator-v{LOCATOR_FORMAT}-{file_version(BOUNDARIES_FILE)}.npz")
+    if os.path.exists(path):
+        return CountryLocator.load(path)
+    locator = CountryLocator.from_geojson(BOUNDARIES_FILE)
+    write_atomic(path, locator.save)
+    return locator
+
+
+# Function to map every meteorite id to the country and continent its landing falls in.
+# Landings in the ocean or on a border are kept and labelled in 'Location Status'.
+def compute_locations(df: pd.DataFrame, locator: CountryLocator | None = None) -> pd.DataFrame:
+    locator = locator or load_locator()
+    code, status = locator.locate(df['reclat'].to_numpy(), df['reclong'].to_numpy())
+    continents = pd.Categorical(locator.continents)
+    return pd.DataFrame({
+        'id': df['id'].to_numpy(),
+        'Country Name': pd.Categorical.from_codes(code, categories=locator.names.tolist()),
+        'Continent Name': pd.Categorical.from_codes(np.where(code >= 0, continents.codes[code], -1), categories=continents.categories),
+        'Location Status': pd.Categorical.from_codes(status, categories=list(LOCATION_STATUS.values())),
+    })
+
+
+# Function to load the id -> country/continent lookup, computing and storing it on first use.
+# The artifact is keyed by the content of both the meteorite data and the boundary file.
+def load_locations(df: pd.DataFrame, data_version: str) -> pd.DataFrame:
+    path = os.path.join(LOCATIONS_DIR, f"locations-v{LOCATIONS_FORMAT}-{data_version}-{file_version(BOUNDARIES_FILE)}.arrow")
+    if os.path.exists(path):
+        return read_frame(path)
+    locations = compute_locations(df)
+    write_frame(path, locations)
+    return locations
+
+
+@st.cache_resource()
+def _preprocess_data(_df: pd.DataFrame, data_version: str, boundaries_version: str) -> SharedFrame:
+    perf.cache_miss()
+    locations = load_locations(_df, data_version)
+    located = locations[locations['Country Name'].notna()].drop(columns='Location Status')
+    located = located.assign(**{column: located[column].cat.remove_unused_categories() for column in ('Country Name', 'Continent Name')})
+    return share(_df.merge(located, on='id', how='inner'))
+
+
+# Function to preprocess data
+@perf.timed('preprocess_data', cached=True)
+def preprocess_data(df: pd.DataFrame, source: str = METEORITES_FILE) -> pd.DataFrame:
+    return _preprocess_data(df, file_version(source), file_version(BOUNDARIES_FILE))
+
+
+@st.cache_resource()
+def _locate_meteorites(_df: pd.DataFrame, data_version: str, boundaries_version: str) -> SharedFrame:
+    perf.cache_miss()
+    locations = load_locations(_df, data_version).drop(columns='Location Status')
+    return share(_df.merge(locations, on='id', how='left'))
+
+
+# Function to attach country and continent to every landing (missing outside any country)
+@perf.timed('locate_meteorites', cached=True)
+def locate_meteorites(df: pd.DataFrame, source: str = METEORITES_FILE) -> pd.DataFrame:
+    return _locate_meteorites(df, file_version(source), file_version(BOUNDARIES_FILE))
+
+
+# Function to load the meteorite cube, building and storing it on first use (keyed like the locations it rolls up)
+def load_cube(located: pd.DataFrame, data_version: str) -> pd.DataFrame:
+    path = os.path.join(CUBES_DIR, f"cube-v{CUBE_FORMAT}-{data_version}-{file_version(BOUNDARIES_FILE)}.arrow")
+    if os.path.exists(path):
+        return read_frame(path)
+    cube = build_cube(located)
+    write_frame(path, cube)
+    return cube
+
+
+@st.cache_resource()
+def _meteorite_cube(_located: pd.DataFrame, data_version: str, boundaries_version: str) -> SharedFrame:
+    perf.cache_miss()
+    return share(load_cube(_located, data_version))
+
+
+# Function to build the pre-aggregated cube behind the Project 1 charts, once per data version
+@perf.timed('meteorite_cube', cached=True)
+def meteorite_cube(located: pd.DataFrame, source: str = METEORITES_FILE) -> pd.DataFrame:
+    return _meteorite_cube(located, file_version(source), file_version(BOUNDARIES_FILE))
+
+
+@st.cache_resource()
+def _meteorite_rows(filename: str, version: str) -> SharedFrame:
+    perf.cache_miss()
+    return share(load_data(filename).dropna())
+
+
+# Function to load the complete meteorite rows with the dtypes of the source file. Exports are written
+# from these: the compact dtypes of load_meteorites (same rows, same order) round coordinates and years.
+@perf.timed('load_meteorite_rows', cached=True)
+def load_meteorite_rows(filename: str = METEORITES_FILE) -> pd.DataFrame:
+    return _meteorite_rows(filename, file_version(filename))
+
+
+@st.cache_resource()
+def _meteorites(filename: str, version: str) -> SharedFrame:
+    perf.cache_miss()
+    return share(load_meteorite_rows(filename).astype(METEORITE_DTYPES))
+
+
+# Function to load the meteorite landings with complete rows and compact dtypes
+@perf.timed('load_meteorites', cached=True)
+def load_meteorites(filename: str = METEORITES_FILE) -> pd.DataFrame:
+    return _meteorites(filename, file_version(filename))
+
+
+# Function to load the proximity index over the landings of a meteorite table, building and storing it on first use
+def load_proximity_index(df: pd.DataFrame, data_version: str) -> ProximityIndex:
+    path = os.path.join(PROXIMITY_DIR, f"proximity-v{PROXIMITY_FORMAT}-{data_version}.npz")
+    if os.path.exists(path):
+        return ProximityIndex.load(path)
+    index = ProximityIndex.from_points(df['reclat'].to_numpy(), df['reclong'].to_numpy())
+    write_atomic(path, index.save)
+    return index
+
+
+@st.cache_resource()
+def _proximity_index(_df: pd.DataFrame, data_version: str) -> ProximityIndex:
+    perf.cache_miss()
+    return load_proximity_index(_df, data_version)
+
+
+# Function to get the proximity index over the landings of load_meteorites(source), by row position
+@perf.timed('proximity_index', cached=True)
+def proximity_index(df: pd.DataFrame, source: str = METEORITES_FILE) -> ProximityIndex:
+    return _proximity_index(df, file_version(source))
+
+
+# Function to find the landings within radius_km of a point, or its k nearest landings (nearest first),
+# as the matching rows of load_meteorites(source) with their great-circle distance
+@perf.timed('nearby_landings')
+def nearby_landings(df: pd.DataFrame, lat: float, lon: float, radius_km: float | None = None, k: int | None = None,
+                    source: str = METEORITES_FILE) -> pd.DataFrame:
+    if (radius_km is None) == (k is None):
+        raise ValueError("Pass exactly one of radius_km and k")
+    index = proximity_index(df, source)
+    rows, km = index.within(lat, lon, radius_km) if k is None else index.nearest(lat, lon, k)
+    return df.iloc[rows].assign(**{'Distance (km)': km})
+
+
+# Country locator of a stream_meteorites worker, loaded once per process
+_stream_locator = functools.cache(load_locator)
+
+
+# Function to locate one chunk of landings and build its part of the meteorite cube (runs in the workers)
+def _chunk_cube(chunk: pd.DataFrame) -> pd.DataFrame:
+    locations = compute_locations(chunk, _stream_locator()).drop(columns='Location Status')
+    return build_cube(chunk.merge(locations, on='id', how='left')[CUBE_COLUMNS])
+
+
+def _meteorite_chunks(filename: str, chunk_rows: int):
+    for chunk in pd.read_csv(filename, chunksize=chunk_rows):
+        yield chunk.dropna().astype(METEORITE_DTYPES)
+
+
+# Function to build the meteorite cube and dataset summary of a landings file too large to load at once.
+# The file is read chunk by chunk: each chunk is located and rolled up into a partial cube (in a pool of
+# `workers` processes when more than one), while the summary is fed the same rows in order. Only a few
+# chunks and partial cubes are held at a time, and the results are the same as meteorite_cube() over
+# locate_meteorites() and dataset_summary() over load_meteorites() of the whole file.
+@perf.timed('stream_meteorites')
+def stream_meteorites(filename: str = METEORITES_FILE, chunk_rows: int = STREAM_CHUNK_ROWS, workers: int = 1) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Built here first, so the workers only ever read the stored locator
+    load_locator()
+    cubes: list[pd.DataFrame] = []
+    pending: deque = deque()
+
+    def fold(cube: pd.DataFrame) -> None:
+        cubes.append(cube)
+        if len(cubes) >= STREAM_PENDING_CUBES:
+            cubes[:] = [merge_cubes(cubes)]
+
+    with ProcessPoolExecutor(workers) if workers > 1 else nullcontext() as pool:
+        def locate(chunks):
+            for chunk in chunks:
+                if pool is None:
+                    fold(_chunk_cube(chunk))
+                else:
+                    pending.append(pool.submit(_chunk_cube, chunk))
+                    while len(pending) > 2 * workers:
+                        fold(pending.popleft().result())
+                yield chunk
+
+        summary = summarize_chunks(rechunk(locate(_meteorite_chunks(filename, chunk_rows))))
+        while pending:
+            fold(pending.popleft().result())
+    return merge_cubes(cubes), summary
+
+
+# Registry of the datasets the pages can ask for, keyed by name
+# (each loader receives a callable to fetch the datasets it depends on)
+DATASETS: dict[str, Callable[[Callable[[str], pd.DataFrame]], pd.DataFrame]] = {
+    'meteorites': lambda load: load_meteorites(),
+    'merged_meteorites': lambda load: preprocess_data(load('meteorites')),
+    'located_meteorites': lambda load: locate_meteorites(load('meteorites')),
+    'meteorite_cube': lambda load: meteorite_cube(load('located_meteorites')),
+    'fetal_health': lambda load: load_data(FETAL_HEALTH_FILE),
+    'agency': lambda load: load_data(AGENCY_FILE),
+}
+
+# Files each dataset is derived from
+DATASET_SOURCES = {
+    'meteorites': (METEORITES_FILE,),
+    'merged_meteorites': (METEORITES_FILE, BOUNDARIES_FILE),
+    'located_meteorites': (METEORITES_FILE, BOUNDARIES_FILE),
+    'meteorite_cube': (METEORITES_FILE, BOUNDARIES_FILE),
+    'fetal_health': (FETAL_HEALTH_FILE,),
+    'agency': (AGENCY_FILE,),
+}
+
+# Startup phase each dataset's first load is reported under (see perf.startup_phase)
+DATASET_PHASES = {
+    'meteorites': 'load',
+    'merged_meteorites': 'preprocess',
+    'located_meteorites': 'preprocess',
+    'meteorite_cube': 'preprocess',
+    'fetal_health': 'load',
+    'agency': 'load',
+}
+
+
+# Function to get the version of a dataset from the content of the files it is derived from
+def dataset_version(name: str) -> str:
+    return '-'.join(file_version(filename) for filename in DATASET_SOURCES[name])
+
+
+# Read-only view over the datasets a page declared, each one loaded on first access
+class LazyDatasets(Mapping):
+    def __init__(self, names: Iterable[str]):
+        self._names = tuple(names)
+        unknown = [name for name in self._names if name not in DATASETS]
+        if unknown:
+            raise KeyError(f"Unknown dataset(s): {', '.join(unknown)}")
+        self._loaded: dict[str, pd.DataFrame] = {}
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        if name not in self._names:
+            raise KeyError(f"Dataset '{name}' was not declared for this page")
+        return self._load(name)
+
+    def _load(self, name: str) -> pd.DataFrame:
+        if name not in self._loaded:
+            with perf.startup_phase(DATASET_PHASES[name], name):
+                self._loaded[name] = DATASETS[name](self._load)
+        return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
@@ -0,0 +1,88 @@
+import gzip
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import perf
+from storage import ARTIFACTS_DIR, write_atomic
+
+EXPORTS_DIR = os.path.join(ARTIFACTS_DIR, 'exports')
+
+# Download formats as (file extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV (gzip)': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+# Bump when what goes into an export changes, so files stored by earlier code are not served
+EXPORT_FORMAT = 2
+
+# Rows serialized at a time, so peak memory stays flat as the dataset grows
+CHUNK_ROWS = 50_000
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+# Function to stream a data frame to a file in the given format, one chunk at a time
+def write_export(df: pd.DataFrame, path: str, fmt: str, chunk_rows: int = CHUNK_ROWS) -> None:
+    if fmt == 'Parquet':
+        writer = None
+        try:
+            for chunk in _chunks(df, chunk_rows):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+    opener = gzip.open if fmt == 'CSV (gzip)' else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(_chunks(df, chunk_rows)):
+            chunk.to_csv(f, header=i == 0, index=False)
+
+
+# Function to get the export file of the whole dataset for a data version, writing it on first request.
+# Only unfiltered exports are kept on disk: one file per data version and format.
+def export_file(df: pd.DataFrame, fmt: str, name: str, version: str) -> str:
+    extension, _ = EXPORT_FORMATS[fmt]
+    path = os.path.join(EXPORTS_DIR, f"{name}-v{EXPORT_FORMAT}-{version}{extension}")
+    with perf.section('export_file', cached=True) as record:
+        if not os.path.exists(path):
+            perf.cache_miss()
+            write_atomic(path, lambda tmp_path: write_export(df, tmp_path, fmt))
+        record['bytes'] = os.path.getsize(path)
+    return path
+
+
+# Function to export a filtered view: streamed to a temporary file like any export, read back and deleted
+def export_bytes(df: pd.DataFrame, fmt: str) -> bytes:
+    extension, _ = EXPORT_FORMATS[fmt]
+    with perf.section('export_bytes') as record, tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"export{extension}")
+        write_export(df, path, fmt)
+        with open(path, 'rb') as f:
+            data = f.read()
+        record['bytes'] = len(data)
+    return data
+
+
+# Function to get a download_button data callable that builds the export only when clicked.
+# A view (e.g. sidebar filters) is exported from scratch on each click and never stored; `rows`
+# are the positions of its rows in df (df is taken as already filtered when they are not given).
+def deferred_export(df: pd.DataFrame, fmt: str, name: str, version: str, view: dict | None = None, rows=None):
+    def read_export() -> bytes:
+        if view:
+            return export_bytes(df if rows is None else df.iloc[rows], fmt)
+        with open(export_file(df, fmt, name, version), 'rb') as f:
+            return f.read()
+
+    return read_export
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+
+# Categorical columns that can be filtered by value
+CATEGORY_FILTERS = ('recclass', 'fall', 'nametype')
+
+
+# Indexes over the meteorite landings so that a filter costs about the size of its result.
+# Years and masses are kept sorted (a range is two binary searches), and every category
+# value keeps the sorted list of its rows. A query starts from the smallest candidate set
+# and checks the remaining conditions on those rows only.
+class MeteoriteIndex:
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self.year = df['year'].to_numpy()
+        self.mass = df['mass (g)'].to_numpy()
+        self.year_order = np.argsort(self.year, kind='stable')
+        self.sorted_year = self.year[self.year_order]
+        self.mass_order = np.argsort(self.mass, kind='stable')
+        self.sorted_mass = self.mass[self.mass_order]
+
+        self.categories: dict[str, pd.Index] = {}
+        self.codes: dict[str, np.ndarray] = {}
+        self.postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for column in CATEGORY_FILTERS:
+            values = df[column].astype('category')
+            codes = values.cat.codes.to_numpy()
+            order = np.argsort(codes, kind='stable')
+            offsets = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+            self.categories[column] = values.cat.categories
+            self.codes[column] = codes
+            self.postings[column] = (order, offsets)
+
+    def _range_rows(self, order: np.ndarray, sorted_values: np.ndarray, bounds: tuple) -> np.ndarray:
+        low, high = bounds
+        return order[np.searchsorted(sorted_values, low, side='left'):np.searchsorted(sorted_values, high, side='right')]
+
+    def _category_codes(self, column: str, values) -> np.ndarray:
+        return self.categories[column].get_indexer(list(values))
+
+    def _category_rows(self, column: str, values) -> np.ndarray:
+        order, offsets = self.postings[column]
+        codes = self._category_codes(column, values)
+        return np.concatenate([order[offsets[code]:offsets[code + 1]] for code in codes if code >= 0] or [np.empty(0, dtype=np.int64)])
+
+    def _category_size(self, column: str, values) -> int:
+        _, offsets = self.postings[column]
+        return int(sum(offsets[code + 1] - offsets[code] for code in self._category_codes(column, values) if code >= 0))
+
+    # Function to get the sorted row positions matching every given condition.
+    # years and mass are inclusive (low, high) ranges; categories are collections of values.
+    @perf.timed('filter_query')
+    def query(self, years: tuple | None = None, mass: tuple | None = None, **categories) -> np.ndarray:
+        categories = {column: values for column, values in categories.items() if values is not None}
+        sizes = {}
+        if years is not None:
+            sizes['years'] = np.searchsorted(self.sorted_year, years[1], side='right') - np.searchsorted(self.sorted_year, years[0], side='left')
+        if mass is not None:
+            sizes['mass'] = np.searchsorted(self.sorted_mass, mass[1], side='right') - np.searchsorted(self.sorted_mass, mass[0], side='left')
+        for column, values in categories.items():
+            sizes[column] = self._category_size(column, values)
+        if not sizes:
+            return np.arange(self.size)
+
+        start = min(sizes, key=sizes.get)
+        if start == 'years':
+            rows = self._range_rows(self.year_order, self.sorted_year, years)
+        elif start == 'mass':
+            rows = self._range_rows(self.mass_order, self.sorted_mass, mass)
+        else:
+            rows = self._category_rows(start, categories[start])
+
+        keep = np.ones(len(rows), dtype=bool)
+        if years is not None and start != 'years':
+            keep &= (self.year[rows] >= years[0]) & (self.year[rows] <= years[1])
+        if mass is not None and start != 'mass':
+            keep &= (self.mass[rows] >= mass[0]) & (self.mass[rows] <= mass[1])
+        for column, values in categories.items():
+            if column != start:
+                # The extra last slot stands for code -1 (missing or unknown values)
+                allowed = np.zeros(len(self.categories[column]) + 1, dtype=bool)
+                allowed[self._category_codes(column, values)] = True
+                allowed[-1] = False
+                keep &= allowed[self.codes[column][rows]]
+        return np.sort(rows[keep])
+
+
+# Function to build the filter indexes for a dataset version
+@perf.timed('meteorite_index', cached=True)
+@st.cache_resource()
+def meteorite_index(_df: pd.DataFrame, version: str) -> MeteoriteIndex:
+    perf.cache_miss()
+    return MeteoriteIndex(_df)
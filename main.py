@@ -1,15 +1,14 @@
-import geopandas as gpd
-import pandas as pd
-import plotly.express as px
 import streamlit as st
-import plotly.graph_objs as go
-import numpy as np
-import os
+import functools
+
+# pandas, numpy and plotly are imported by the page sections that use them (timed by perf)
+import assets
+import perf
 
 # Set page title and icon
 st.set_page_config(
     page_title="A.Rahman's Portfolio",
-    page_icon="Logo_s.png",
+    page_icon=assets.asset("Logo_s.png", "icon"),
     layout="wide"
 )
 
@@ -21,50 +20,31 @@ hide_menu_style = """
         """
 st.markdown(hide_menu_style, unsafe_allow_html=True)
 
-
-# Function to load data
-@st.cache_data()
-def load_data(filename: str) -> pd.DataFrame:
-    if filename.endswith(".csv"):
-        df = pd.read_csv(filename)
-    elif filename.endswith(".xlsx"):
-        df = pd.read_excel(filename)
-    return df
-
-
-# Function to preprocess data
-@st.cache_data()
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
-    geo_data = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.reclong, df.reclat))
-    world = gpd.read_file(gpd.datasets.get_path('naturalearth_lowres'))
-    merged = gpd.sjoin(geo_data, world, how="inner", op='intersects')
-    merged.drop(columns=['index_right', 'geometry'], inplace=True)
-    merged.rename(columns={'continent': 'Continent Name', 'name_right': 'Country Name'}, inplace=True)
-    return merged
-
-
-# Load data
-df_meteorites = load_data("Meteorite_Landings(1).csv").dropna()
-df_fetal_health = load_data("fetal_health.csv")
-df_agency = load_data("Agency (G).xlsx")
-
-# Preprocess data
-merged_data = preprocess_data(df_meteorites)
-
-# Screenshots
-screenshots_directory = 'screenshots'
-
 # Create a sidebar menu
 st.sidebar.title('Navigation')
 pages = ('Home', 'Project 1: Meteorite Landings', 'Project 2: Fetal Health Classification', 'Project 3: Quality Control System', 'Project 4: Customer Dashboard', 'Contact')
+# The performance panel is opt-in and unlisted: it only shows up for ?perf=<token> (see perf.py)
+if perf.panel_enabled(st.query_params):
+    pages += ('Performance',)
 page = st.sidebar.radio('Go to:', pages)
 
-# Add the logo with different sizes based on the page
+# Datasets each page needs; they are only loaded when the page first uses them
+page_datasets = {
+    'Project 1: Meteorite Landings': ('meteorites', 'located_meteorites', 'meteorite_cube'),
+    'Project 2: Fetal Health Classification': ('fetal_health',),
+    'Project 3: Quality Control System': ('agency',),
+}
+if page in page_datasets:
+    with perf.startup_phase('import', 'datasets'):
+        from datasets import LazyDatasets, dataset_version
+    data = LazyDatasets(page_datasets[page])
+
+# Add the logo with different sizes based on the page (resized WebP variants, see assets.py)
 logo_image = "Logo.png"
 if page == 'Home' or page == 'Contact':
-    st.image(logo_image, use_column_width=True)
+    st.image(assets.asset(logo_image, 'wide'), width='stretch')
 else:
-    st.image(logo_image, width=300)
+    st.image(assets.asset(logo_image, 'small'), width=300)
 
 # Define the content for each page
 if page == 'Home':
@@ -104,56 +84,116 @@ if page == 'Home':
     st.write('If you have any inquiries or would like to collaborate on a project, feel free to reach out to me. You can find my contact information below.')
 
 elif page == 'Project 1: Meteorite Landings':
+    with perf.startup_phase('import', 'project 1'):
+        import aggregates
+        import charts
+        import datasets
+        import exports
+        import filters
+        import summary
+
     st.header('Project 1: Meteorite Landings')
     st.subheader('Introduction')
     st.write('The study of meteorites has long captivated scientists and enthusiasts alike, providing insight into the formation and evolution of our solar system. In this data analysis project, we examine some of the key findings regarding landed '
              'meteorites on Earth, including their distribution, composition, and average mass.')
 
-    csv = df_meteorites.to_csv(index=False).encode('utf-8')
+    df_meteorites = data['meteorites']
+    meteorite_index = filters.meteorite_index(df_meteorites, dataset_version('meteorites'))
+
+    ## Sidebar filters (only the ones moved away from their defaults are applied)
+    st.sidebar.markdown("---")
+    st.sidebar.subheader('Filters')
+    min_year, max_year = int(meteorite_index.sorted_year[0]), int(meteorite_index.sorted_year[-1])
+    year_range = st.sidebar.slider('Year', min_year, max_year, (min_year, max_year))
+    classes = st.sidebar.multiselect('Class', list(meteorite_index.categories['recclass']), placeholder='All classes')
+    mass_steps = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+    mass_range = st.sidebar.select_slider('Mass (g)', options=mass_steps, value=(mass_steps[0], mass_steps[-1]), format_func=lambda mass: f"{mass:,}{'+' if mass == mass_steps[-1] else ''}")
+    falls = st.sidebar.multiselect('Fall', list(meteorite_index.categories['fall']), placeholder='Fell and found')
+    nametypes = st.sidebar.multiselect('Name type', list(meteorite_index.categories['nametype']), placeholder='Valid and relict')
+
+    view = {}
+    if year_range != (min_year, max_year):
+        view['years'] = year_range
+    if mass_range != (mass_steps[0], mass_steps[-1]):
+        view['mass'] = (mass_range[0], mass_range[1] if mass_range[1] != mass_steps[-1] else float('inf'))
+    for column, selected in (('recclass', classes), ('fall', falls), ('nametype', nametypes)):
+        if selected:
+            # Sorted, so the same selection gives the same figure keys whatever the order it was picked in
+            view[column] = sorted(selected)
+
+    if view:
+        # located_meteorites keeps the row order of df_meteorites, so positions line up
+        view_rows = meteorite_index.query(**view)
+        df_view = df_meteorites.iloc[view_rows]
+        # The filtered cube is only built if one of the charts below is not cached yet
+        view_cube = functools.cache(lambda: aggregates.build_cube(data['located_meteorites'][aggregates.CUBE_COLUMNS].iloc[view_rows]))
+        st.info(f"Showing {len(df_view):,} of {len(df_meteorites):,} landings matching the sidebar filters.")
+    else:
+        df_view = df_meteorites
+        view_cube = lambda: data['meteorite_cube']
+
+    # Figures are reused across reruns while the data version, filters and theme stay the same
+    meteorites_version = dataset_version('meteorites')
+    theme = st.context.theme.type
+
+    # The export is only written when the button is clicked; the unfiltered one is then kept for this data version.
+    # It is written from the rows as typed in the source file (df_meteorites has compact dtypes that round coordinates).
+    export_format = st.selectbox('Download format', tuple(exports.EXPORT_FORMATS))
+    export_extension, export_mime = exports.EXPORT_FORMATS[export_format]
     st.download_button(
-        label="Download Raw Data",
-        data=csv,
-        file_name='Meteorite_Landings.csv',
-        mime='text/csv',
+        label="Download Raw Data" if not view else "Download Filtered Data",
+        data=exports.deferred_export(datasets.load_meteorite_rows(), export_format, 'Meteorite_Landings', dataset_version('meteorites'), view,
+                                     rows=view_rows if view else None),
+        file_name=f'Meteorite_Landings{export_extension}',
+        mime=export_mime,
     )
 
     link = 'https://www.kaggle.com/code/rahman96/meteorite-landings-findings'
     st.markdown(f"To access the source code and analysis steps, click [here]({link})")
     st.markdown("---")
     st.subheader("Dataset Overview")
-    st.write(df_meteorites.describe(include='all'))
+    st.write(summary.dataset_summary(df_meteorites, dataset_version('meteorites')))
     st.markdown("---")
     st.subheader("Meteorite Landing Distribution")
 
     ## Distribution map
-    fig_map = px.scatter_mapbox(df_meteorites.loc[(df_meteorites["year"] >= 1900) & (df_meteorites["year"] < 2020)], lat="reclat", lon="reclong", hover_name="recclass", color='year', hover_data=['mass (g)'],
-                                color_continuous_scale=px.colors.sequential.Viridis)
-
-    # customize the layout of the Map
-    fig_map.update_layout(
-        mapbox_style="open-street-map",
-        mapbox=dict(center=dict(lat=0, lon=0), zoom=0),
-        margin=dict(l=0, r=0, t=0, b=0),
-        width=1100, height=1000)
-
-    st.plotly_chart(fig_map)
+    # Focus presets are in charts.MAP_FOCUS; detail follows the zoom level
+    focus_col, zoom_col, mode_col = st.columns(3)
+    focus = focus_col.selectbox('Focus', tuple(charts.MAP_FOCUS))
+    focus_lat, focus_lon, focus_zoom = charts.MAP_FOCUS[focus]
+    zoom = zoom_col.slider('Zoom', min_value=0.0, max_value=10.0, value=float(focus_zoom), step=0.5, key=f'map_zoom_{focus}')
+    map_mode = mode_col.selectbox('Detail', charts.MAP_MODES, help='Auto shows individual landings once few enough are in view and binned landings otherwise.')
+    map_params = charts.map_params(year_range, focus, zoom, map_mode)
+    charts.show_figure(
+        st, 'landing_map', lambda: charts.landing_map(df_meteorites.iloc[meteorite_index.query(**{**view, 'years': map_params['years']})], focus_lat, focus_lon, zoom, map_mode),
+        meteorites_version, view, theme, params=map_params)
+
+    ## Nearby landings (searches all landings, regardless of the sidebar filters)
+    # The proximity index is only loaded once the expander is opened
+    nearby_section = st.expander('Find landings near a point', expanded=False, key='nearby_landings', on_change='rerun')
+    if nearby_section.open:
+        with nearby_section:
+            lat_col, lon_col, search_col, size_col = st.columns(4)
+            near_lat = lat_col.number_input('Latitude', min_value=-90.0, max_value=90.0, value=float(focus_lat), step=0.5, key='near_lat')
+            near_lon = lon_col.number_input('Longitude', min_value=-180.0, max_value=180.0, value=float(focus_lon), step=0.5, key='near_lon')
+            search = search_col.radio('Search', ('Within a radius', 'Nearest landings'), key='near_search')
+            if search == 'Within a radius':
+                radius_km = size_col.number_input('Radius (km)', min_value=1, max_value=20_000, value=100, step=50, key='near_radius')
+                nearby = datasets.nearby_landings(df_meteorites, near_lat, near_lon, radius_km=radius_km)
+            else:
+                k = size_col.number_input('Landings', min_value=1, max_value=1_000, value=10, key='near_k')
+                nearby = datasets.nearby_landings(df_meteorites, near_lat, near_lon, k=k)
+            st.write(f"{len(nearby):,} landings found, nearest first{' (showing the first 1,000)' if len(nearby) > 1_000 else ''}.")
+            st.dataframe(nearby.head(1_000)[['name', 'recclass', 'mass (g)', 'year', 'reclat', 'reclong', 'Distance (km)']], hide_index=True,
+                         column_config={'year': st.column_config.NumberColumn(format='%d'), 'Distance (km)': st.column_config.NumberColumn(format='%.1f')})
 
     one, two = st.columns(2)
 
     ## Distribution per continent (pie)
-    continents = merged_data['Continent Name'].value_counts().reset_index()
-    total_meteorites = continents['count'].sum()
-    # Convert 'Count' column to numeric values
-    continents['count'] = pd.to_numeric(continents['count'])
-
-    continents['Percentage'] = 100 * continents['count'] / total_meteorites
-
-    fig_location = px.pie(continents, values="Percentage", names="Continent Name", title="<b>Meteorites Per Continent</b>",
-                          color_discrete_sequence=px.colors.qualitative.Set2,
-                          labels={'Percentage': 'Percentage of Meteorites'},
-                          hole=0.5)
-    one.plotly_chart(fig_location, use_container_width=True)
-    one.write("About {:.1f}% of landed meteorites were found in Antarctica.".format(continents.loc[continents['Continent Name'] == 'Antarctica', 'Percentage'].values[0]))
+    fig_location = charts.show_figure(one, 'continent_pie', lambda: charts.continent_pie(view_cube()), meteorites_version, view, theme, width='stretch')
+    antarctica_share = charts.pie_share(fig_location, 'Antarctica')
+    if antarctica_share is not None:
+        one.write("About {:.1f}% of landed meteorites were found in Antarctica.".format(antarctica_share))
     one.write("There are several reasons why Antarctica has such a high number of recorded meteorite landings. One of the main factors is the continent's vast and pristine expanses of ice, which provide a stark contrast to the dark color of most "
               "meteorites, making them easier to spot. Additionally, Antarctica's cold and dry climate helps to preserve meteorites once they land, preventing them from eroding or being covered by vegetation over time.")
     one.write("Another contributing factor is the fact that Antarctica is relatively free from human activity, which reduces the likelihood of meteorites being disturbed or destroyed by human interference. Furthermore, the high winds and extreme "
@@ -162,39 +202,8 @@ elif page == 'Project 1: Meteorite Landings':
               "large number of recorded meteorite landings in Antarctica.")
 
     ## Distribution per country
-
-    # Get data
-    countries = merged_data.loc[merged_data['Country Name'] != "Antarctica", "Country Name"].value_counts().head(10)
-
-    # Create figure
-    fig = go.Figure()
-
-    # Add bars
-    fig.add_trace(go.Bar(
-        x=countries.index,
-        y=countries,
-        text=countries,
-        textposition="auto",
-        marker=dict(
-            color=countries,
-            colorscale="Viridis",
-            opacity=0.8
-        )
-    ))
-
-    # Update layout
-    fig.update_layout(
-        title="<b>Meteorites Per Country (excluding Antarctica)</b>",
-        xaxis=dict(title="Country"),
-        yaxis=dict(title="Number of Meteorites"),
-        plot_bgcolor="rgba(0,0,0,0)",
-        showlegend=False
-    )
-    fig.update_xaxes(showgrid=False)
-    fig.update_yaxes(showgrid=False, visible=False)
-
     with two:
-        st.plotly_chart(fig, use_container_width=True)
+        charts.show_figure(st, 'country_bars', lambda: charts.country_bars(view_cube()), meteorites_version, view, theme, width='stretch')
     with two:
         st.write("Despite its small area, Oman has the second-highest number of recorded meteorite landings after Antarctica.")
         st.write("There are various plausible reasons. Firstly, the desert landscape and lack of vegetation in Oman make it easier to detect fallen meteorites. Secondly, the region's extensive history of trade and commerce "
@@ -206,28 +215,13 @@ elif page == 'Project 1: Meteorite Landings':
     one1, two1 = st.columns(2)
 
     ## Classes Counts
-    top_classes = df_meteorites['recclass'].value_counts().head(15).reset_index()
-    fig_noofd = px.bar(top_classes, y="count", x="recclass", title="<b>Meteorite Classes</b>", text="recclass", height=500)
-    fig_noofd.update_layout(plot_bgcolor="rgba(0,0,0,0)", xaxis=dict(showgrid=False), yaxis=dict(showgrid=False), barmode="stack", legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=-0.2,
-        xanchor="center",
-        x=0.5
-    ))
-    fig_noofd.update_traces(marker_color=['#B2DBE5' if y < 5000 else '#F2A694' for y in top_classes['count']])
-    one1.plotly_chart(fig_noofd, use_container_width=True)
+    charts.show_figure(one1, 'class_count_bars', lambda: charts.class_count_bars(view_cube()), meteorites_version, view, theme, width='stretch')
     one1.write("Of all the types of landed meteorites, the L6 and H5 classes are the most commonly found.")
     one1.write("Both classes are relatively common in the asteroid belt, which is where most meteorites originate. Therefore, the higher number of L6 and H5 meteorites in the asteroid belt means that there is a greater likelihood of these types of "
                "meteorites landing on Earth.")
 
     ## Average Mass per meteorite class
-    dff = df_meteorites.groupby(['recclass'])['mass (g)'].mean().reset_index().set_index('recclass').sort_values(by='mass (g)', ascending=False).head(20)
-    dff["mass (g)"] = dff["mass (g)"].round()
-    fig_mass = px.bar(dff.sort_values(by='mass (g)', ascending=False), y="mass (g)", x=dff.index, title="<b>Meteorite Average Mass (g)</b>", text="mass (g)", height=500)
-    fig_mass.update_layout(plot_bgcolor="rgba(0,0,0,0)", xaxis=dict(showgrid=False), yaxis=dict(showgrid=False, title="Average Mass (g)"), barmode="stack")
-    fig_mass.update_traces(marker_color=['#E6A0C4' if y > 1000000 else '#B39EB5' for y in dff['mass (g)']])
-    two1.plotly_chart(fig_mass, use_container_width=True)
+    charts.show_figure(two1, 'class_mass_bars', lambda: charts.class_mass_bars(view_cube()), meteorites_version, view, theme, width='stretch')
     two1.write('Compared to other meteorite classes, the average mass of the "iron, IVB" class is notably high, at approximately 4,323 kilograms. this class of meteorites is primarily composed of iron, which is a dense and heavy material. This '
                'high density means that iron IVB meteorites can have a relatively large mass for their size, especially when compared to stony meteorites that have a lower density')
 
@@ -236,82 +230,14 @@ elif page == 'Project 1: Meteorite Landings':
     one2, two2 = st.columns(2)
 
     ## Landings over time
-    df_from_1970_2013 = df_meteorites.loc[(df_meteorites["year"] >= 1970) & (df_meteorites["year"] <= 2013)]
-    df_from_1970_2013 = df_from_1970_2013.groupby(['year'])['id'].count().reset_index().set_index('year')
-    df_from_1970_2013 = df_from_1970_2013.rename(columns={"id": "# of Meteorites"})
-
-    # Set a new color palette
-    colors = ["#1f77b4"]
-    fig = px.line(df_from_1970_2013, x=df_from_1970_2013.index, y='# of Meteorites', markers=True, title="<b>Yearly Meteorite Landings</b>", color_discrete_sequence=colors)
-
-    fig.update_yaxes(title_text="# of Meteorites")
-    fig.update_layout(plot_bgcolor="rgba(0,0,0,0)")
-    one2.plotly_chart(fig, use_container_width=False)
+    charts.show_figure(one2, 'yearly_landings_line', lambda: charts.yearly_landings_line(view_cube()), meteorites_version, view, theme, width='content')
     st.write("The number of meteorite landings increased sharply in the early 2000s, possibly due to increased efforts in meteorite hunting or advances in detection technology.")
 
     ## Animated Yearly landings per continent
-    yearly_counts = merged_data.loc[merged_data['year'].between(1970, 2013), :]
-    yearly_counts = yearly_counts.groupby(['year', 'Continent Name'])['id'].count().reset_index()
-    yearly_counts = yearly_counts.sort_values(['Continent Name', 'year'])
-    yearly_counts['Running Total'] = yearly_counts.groupby('Continent Name')['id'].cumsum()
-
-    colors = px.colors.qualitative.Safe
-
-    fig = go.Figure()
-    for i, continent in enumerate(yearly_counts['Continent Name'].unique()):
-        data = yearly_counts.loc[yearly_counts['Continent Name'] == continent, :]
-        fig.add_trace(go.Scatter(
-            x=data['year'],
-            y=data['Running Total'],
-            name=continent,
-            mode='lines',
-            line=dict(color=colors[i], width=2),
-            fill='tozeroy',
-            hovertemplate="Year: %{x}<br>Running Total: %{y:.0f}"
-        ))
-    fig.update_layout(
-        title="<b>Yearly Landings per Continent</b>",
-        plot_bgcolor="rgba(0,0,0,0)",
-        xaxis=dict(title="Year", showgrid=False),
-        yaxis=dict(title="Running Total"),
-        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
-        transition=dict(duration=500, easing="linear")
-    )
-    two2.plotly_chart(fig, use_container_width=True)
+    charts.show_figure(two2, 'continent_area', lambda: charts.continent_area(view_cube()), meteorites_version, view, theme, width='stretch')
 
     ## average mass every year
-    df_from_1980_2013_mass = df_meteorites.loc[(df_meteorites["year"] >= 1980) & (df_meteorites["year"] <= 2013)]
-    df_from_1980_2013_mass = df_from_1980_2013_mass.groupby(['year'])['mass (g)'].mean().reset_index().set_index('year').sort_values(by='mass (g)', ascending=False)
-    avg_mass = df_from_1980_2013_mass['mass (g)'].mean()
-    df_from_1980_2013_mass["mass (g)"] = df_from_1980_2013_mass["mass (g)"].round()
-    fig_mass = px.bar(df_from_1980_2013_mass.sort_values(by='mass (g)', ascending=False), y="mass (g)", x=df_from_1980_2013_mass.index, title="Yearly Average Mass of Meteorites (1980-2013)", labels={"x": "Year", "mass (g)": "Average Mass (g)"},
-                      text="mass (g)", height=500)
-
-    fig_mass.add_shape(type="line", x0=df_from_1980_2013_mass.index.min(), y0=avg_mass, x1=df_from_1980_2013_mass.index.max(), y1=avg_mass, line=dict(color="gray", width=2, dash="dot"))
-
-    fig_mass.update_layout(
-        plot_bgcolor="rgba(0,0,0,0)",
-        xaxis=dict(showgrid=False, tickmode='linear'),
-        yaxis=dict(showgrid=False, visible=False),
-        barmode="stack",
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.1,
-            xanchor="right",
-            x=1
-        ),
-        font=dict(
-            family="Arial",
-            size=14
-        )
-    )
-
-    fig_mass.update_traces(
-        marker_color=px.colors.sequential.Blues[::-1],
-    )
-
-    st.plotly_chart(fig_mass, use_container_width=True)
+    charts.show_figure(st, 'yearly_mass_bars', lambda: charts.yearly_mass_bars(view_cube()), meteorites_version, view, theme, width='stretch')
     st.write(
         "From 1980 to 2013, the average mass of meteorites was 2143.38 grams. It should be noted that the high average mass in the mid-1970s was a result of the limited number of recorded meteorites during that time. Moreover, "
         "recent years have shown a trend toward larger average masses, and some years have even surpassed 5 kilograms.")
@@ -339,15 +265,17 @@ elif page == 'Project 3: Quality Control System':
         "The system is also capable of monitoring the performance of each branch, including metrics such as the time taken for sorting shipments or unloading the truck. It provides real-time performance information for each courier, including details on their activity and inactivity periods. Additionally, the system can generate maps that display the locations where couriers have performed any activity during the day.")
     st.markdown("---")
     st.subheader("Dataset Overview")
-    st.write(df_agency.describe(include='all'))
+    df_agency = data['agency']
+    with perf.startup_phase('import', 'summary'):
+        import summary
+    st.write(summary.dataset_summary(df_agency, dataset_version('agency')))
     st.markdown("---")
     st.subheader('Screenshots')
-    with st.expander("Click to See", expanded=False):
-        screenshots = sorted([filename for filename in os.listdir(screenshots_directory) if filename.startswith('qc_screen')])
-        if screenshots:
-            for screenshot in screenshots:
-                screenshot_path = os.path.join(screenshots_directory, screenshot)
-                st.image(screenshot_path, use_column_width=True)
+    # The screenshots are only sent once the expander is opened
+    screenshots = st.expander("Click to See", expanded=False, key='qc_screenshots', on_change='rerun')
+    if screenshots.open:
+        with screenshots:
+            assets.screenshot_gallery('screenshots/qc_screen', key='qc_screenshot_full')
     st.markdown("---")
     st.subheader('Quality Control System Link')
     link = "https://abdelrahman-labs-shipping-quality-control-main-sh8g9x.streamlit.app/"
@@ -367,7 +295,10 @@ elif page == 'Project 2: Fetal Health Classification':
     st.subheader("Dataset Overview")
 
     ## Dataset summary
-    st.write(df_fetal_health.describe(include='all'))
+    df_fetal_health = data['fetal_health']
+    with perf.startup_phase('import', 'summary'):
+        import summary
+    st.write(summary.dataset_summary(df_fetal_health, dataset_version('fetal_health')))
 
     st.markdown("---")
     st.subheader("Fetal Health Classification Model")
@@ -393,12 +324,11 @@ elif page == 'Project 4: Customer Dashboard':
             "By utilizing this customer dashboard, the operation department members can efficiently track the performance of their top customers, identify potential challenges, and take proactive measures to ensure smooth operations and customer satisfaction.")
         st.markdown("---")
         st.subheader('Screenshots')
-        with st.expander("Click to See", expanded=False):
-            screenshots = sorted([filename for filename in os.listdir(screenshots_directory) if filename.startswith('cst_screen')])
-            if screenshots:
-                for screenshot in screenshots:
-                    screenshot_path = os.path.join(screenshots_directory, screenshot)
-                    st.image(screenshot_path, use_column_width=True)
+        # The screenshots are only sent once the expander is opened
+        screenshots = st.expander("Click to See", expanded=False, key='cst_screenshots', on_change='rerun')
+        if screenshots.open:
+            with screenshots:
+                assets.screenshot_gallery('screenshots/cst_screen', key='cst_screenshot_full')
 
         st.markdown("---")
         st.subheader('Customer Dashboard Link')
@@ -416,6 +346,28 @@ elif page == 'Contact':
     st.markdown('**LinkedIn:** [LinkedIn Profile](https://www.linkedin.com/in/a-rahman-mahmoud-642464136)')
     st.markdown('**GitHub:** [GitHub Profile](https://github.com/abdelrahman-labs)')
 
+elif page == 'Performance':
+    import pandas as pd
+    import charts
+
+    st.header('Performance')
+    st.write('Timings of this server process, across all sessions. Startup counts the first import and load of each module and dataset; cached sections count a hit unless their cached work ran.')
+    st.subheader('Startup')
+    st.write(pd.DataFrame([perf.startup_report()], index=['ms']))
+
+    st.subheader('Sections')
+    sections = pd.DataFrame(perf.section_report(), columns=['section', 'count', 'total_ms', 'mean_ms', 'max_ms', 'bytes', 'hits', 'misses', 'hit_rate'])
+    st.dataframe(sections.set_index('section').round(1), width='stretch')
+
+    st.subheader('Figure cache')
+    figures = charts.figure_cache()
+    st.write(f"{len(figures.specs):,} figures, {figures.size / 2 ** 20:.1f} of {figures.max_bytes / 2 ** 20:.0f} MiB, {figures.hits:,} hits, {figures.misses:,} misses")
+
+    st.download_button('Download events (JSON lines)', data=perf.events_jsonl(), file_name='perf-events.jsonl', mime='application/jsonl')
+    if st.button('Reset section timings'):
+        perf.reset_sections()
+        st.rerun()
+
 # Add footer
 st.markdown("---")
 st.markdown(
@@ -0,0 +1,223 @@
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from storage import ARTIFACTS_DIR
+
+# Kept free of pandas/plotly imports: main.py imports this module on every page, before anything heavy
+
+PERF_DIR = os.path.join(ARTIFACTS_DIR, 'perf')
+STARTUP_HISTORY = os.path.join(PERF_DIR, 'startup.jsonl')
+
+STARTUP_PHASES = ('import', 'load', 'preprocess')
+# Cold-start budget of a page (import + load + preprocess), in milliseconds
+STARTUP_BUDGET_MS = 2500
+
+# Recent section events kept for the JSON lines export
+EVENT_LOG_SIZE = 10_000
+# Environment variable holding the token that opens the performance panel (?perf=<token>); unset keeps it off
+PANEL_TOKEN_ENV = 'PORTFOLIO_PERF_TOKEN'
+
+_startup: dict[str, float] = {}
+_startup_keys: set[tuple[str, str]] = set()
+_sections: dict[str, dict] = {}
+_events: deque = deque(maxlen=EVENT_LOG_SIZE)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+# Function to time a startup phase (import, load or preprocess) of this process.
+# Each key (the modules imported, the dataset loaded) is recorded the first time it completes only,
+# so reruns and later sessions do not add their cache hits to the cold-start time.
+# Phases nest: time spent in an inner phase is only counted once, under the inner phase.
+@contextmanager
+def startup_phase(name: str, key: str):
+    stack = _local.__dict__.setdefault('stack', [])
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        inner = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            if (name, key) not in _startup_keys:
+                _startup_keys.add((name, key))
+                _startup[name] = _startup.get(name, 0.0) + elapsed - inner
+
+
+# Function to get the time spent in each startup phase of this process, in milliseconds
+def startup_report() -> dict[str, float]:
+    with _lock:
+        return {phase: round(_startup.get(phase, 0.0), 1) for phase in STARTUP_PHASES}
+
+
+# Function to time a hot-path section (a load, an aggregation, a chart) and record it.
+# The yielded record takes 'bytes' (e.g. payload sent) from the caller. Sections marked
+# cached count as hits unless cache_miss() is called while they are open.
+@contextmanager
+def section(name: str, cached: bool = False):
+    record = {'bytes': None, 'cache': 'hit' if cached else None}
+    records = _local.__dict__.setdefault('records', [])
+    records.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        records.pop()
+        _record(name, elapsed, record)
+
+
+# Function to mark the innermost open cached section as a miss (called from inside cached functions)
+def cache_miss() -> None:
+    records = _local.__dict__.get('records')
+    if records and records[-1]['cache'] is not None:
+        records[-1]['cache'] = 'miss'
+
+
+# Decorator to time every call of a function as a section
+def timed(name: str, cached: bool = False):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name, cached):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(name: str, elapsed: float, record: dict) -> None:
+    with _lock:
+        stats = _sections.get(name)
+        if stats is None:
+            stats = _sections[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'bytes': 0, 'hits': 0, 'misses': 0}
+        stats['count'] += 1
+        stats['total_ms'] += elapsed
+        stats['max_ms'] = max(stats['max_ms'], elapsed)
+        if record['bytes'] is not None:
+            stats['bytes'] += record['bytes']
+        if record['cache'] == 'hit':
+            stats['hits'] += 1
+        elif record['cache'] == 'miss':
+            stats['misses'] += 1
+        _events.append({'time': time.time(), 'section': name, 'ms': round(elapsed, 3), 'bytes': record['bytes'], 'cache': record['cache']})
+
+
+# Function to get the per-section totals since the process started (or the last reset), slowest first
+def section_report() -> list[dict]:
+    with _lock:
+        rows = [{'section': name, **stats} for name, stats in _sections.items()]
+    for row in rows:
+        row['mean_ms'] = row['total_ms'] / row['count']
+        lookups = row['hits'] + row['misses']
+        row['hit_rate'] = row['hits'] / lookups if lookups else None
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+# Function to get the recent section events as JSON lines
+def events_jsonl() -> str:
+    with _lock:
+        events = list(_events)
+    return ''.join(json.dumps(event) + '\n' for event in events)
+
+
+# Function to clear the section totals and events
+def reset_sections() -> None:
+    with _lock:
+        _sections.clear()
+        _events.clear()
+
+
+# Function to tell whether the query parameters open the performance panel
+def panel_enabled(query_params) -> bool:
+    token = os.environ.get(PANEL_TOKEN_ENV)
+    return bool(token) and query_params.get('perf') == token
+
+
+def _child_pages() -> None:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file('main.py', default_timeout=600)
+    at.run()
+    print(json.dumps(list(at.sidebar.radio[0].options)))
+
+
+def _child_startup(page: str) -> None:
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    framework_ms = (time.perf_counter() - start) * 1000
+
+    at = AppTest.from_file('main.py', default_timeout=600)
+    at.run()
+    start = time.perf_counter()
+    at.sidebar.radio[0].set_value(page).run()
+    run_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    # The app ran in this process and imported perf as its own module (this file runs as __main__)
+    phases = sys.modules['perf'].startup_report()
+    print(json.dumps({'page': page, 'framework': round(framework_ms, 1), **phases, 'run': round(run_ms, 1)}))
+
+
+def _run_child(*args: str) -> str:
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), *args], capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def _previous_report() -> dict[str, dict]:
+    if not os.path.exists(STARTUP_HISTORY):
+        return {}
+    with open(STARTUP_HISTORY) as f:
+        lines = f.read().splitlines()
+    return {row['page']: row for row in json.loads(lines[-1])['pages']} if lines else {}
+
+
+# Function to measure the cold start of each page, each in a fresh interpreter, and report it
+# against the budget. Results are appended to the startup history so regressions show up as deltas.
+def startup_benchmark(pages: list[str] | None = None, budget_ms: float = STARTUP_BUDGET_MS) -> bool:
+    pages = pages or json.loads(_run_child('--pages'))
+    previous = _previous_report()
+    rows = [json.loads(_run_child('--startup', page)) for page in pages]
+
+    print(f"{'page':<40} {'framework':>9} {'import':>8} {'load':>8} {'preprocess':>10} {'total':>8} {'budget':>8}  change")
+    within_budget = True
+    for row in rows:
+        row['total'] = round(sum(row[phase] for phase in STARTUP_PHASES), 1)
+        over = row['total'] > budget_ms
+        within_budget &= not over
+        change = f"{row['total'] - previous[row['page']]['total']:+.0f} ms" if row['page'] in previous else ''
+        print(f"{row['page']:<40} {row['framework']:>9.0f} {row['import']:>8.0f} {row['load']:>8.0f} {row['preprocess']:>10.0f} {row['total']:>8.0f} "
+              f"{'OVER' if over else 'ok':>8}  {change}")
+
+    os.makedirs(PERF_DIR, exist_ok=True)
+    with open(STARTUP_HISTORY, 'a') as f:
+        f.write(json.dumps({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'budget_ms': budget_ms, 'pages': rows}) + '\n')
+    return within_budget
+
+
+if __name__ == '__main__':
+    # Pages and data files are resolved relative to the app folder
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Measure the cold-start time of the app pages against a budget.')
+    parser.add_argument('pages', nargs='*', help='pages to measure (default: all)')
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS, help='cold-start budget per page, in milliseconds')
+    parser.add_argument('--pages', dest='list_pages', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--startup', metavar='PAGE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.list_pages:
+        _child_pages()
+    elif args.startup:
+        _child_startup(args.startup)
+    else:
+        sys.exit(0 if startup_benchmark(args.pages, args.budget_ms) else 1)
@@ -0,0 +1,472 @@
+import json
+
+import numpy as np
+
+# Status reported for every located point
+INSIDE = 0  # strictly inside exactly one country
+OCEAN = 1  # not inside any country
+BORDER = 2  # on a boundary line or inside more than one polygon
+INVALID = 3  # missing or out-of-range coordinates
+
+# Bump when the prebuilt index layout changes
+LOCATOR_FORMAT = 1
+
+# Marker values in the per-cell country table
+_MIXED = -2
+_NONE = -1
+
+
+# Function to read country polygons from a GeoJSON file as edge arrays
+def read_boundaries(filename: str) -> tuple[list[str], list[str], np.ndarray, np.ndarray]:
+    with open(filename) as f:
+        features = json.load(f)['features']
+    names, continents, edges, edge_country = [], [], [], []
+    for code, feature in enumerate(features):
+        names.append(feature['properties']['name'])
+        continents.append(feature['properties']['continent'])
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        for polygon in polygons:
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                if not np.array_equal(ring[0], ring[-1]):
+                    ring = np.vstack([ring, ring[:1]])
+                edges.append(np.hstack([ring[:-1], ring[1:]]))
+                edge_country.append(np.full(len(ring) - 1, code, dtype=np.int32))
+    return names, continents, np.vstack(edges), np.concatenate(edge_country)
+
+
+# Function to test points against a set of polygon edges with an even-odd ray cast
+def _ray_parity(px: np.ndarray, py: np.ndarray, edges: np.ndarray, block: int = 1 << 22) -> np.ndarray:
+    inside = np.zeros(len(px), dtype=bool)
+    step = max(1, block // max(1, len(edges)))
+    ax, ay, bx, by = (edges[:, i][None, :] for i in range(4))
+    for start in range(0, len(px), step):
+        x = px[start:start + step, None]
+        y = py[start:start + step, None]
+        straddle = (ay > y) != (by > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cross_x = ax + (y - ay) * (bx - ax) / (by - ay)
+        inside[start:start + step] = np.logical_xor.reduce(straddle & (x < cross_x), axis=1)
+    return inside
+
+
+# Function to find which of the pairs (point, edge) have the point lying on the edge
+def _on_edge(px, py, ax, ay, bx, by) -> np.ndarray:
+    collinear = (bx - ax) * (py - ay) - (by - ay) * (px - ax) == 0
+    within = (np.minimum(ax, bx) <= px) & (px <= np.maximum(ax, bx)) & (np.minimum(ay, by) <= py) & (py <= np.maximum(ay, by))
+    return collinear & within
+
+
+# Country lookup over prebuilt polygons.
+# A regular lon/lat grid is precomputed: cells that no boundary passes through resolve
+# directly to a country (or the ocean), and for the rest each candidate country stores
+# the edges crossing the cell plus whether a reference point in the cell is inside it.
+# A query point then only needs the parity of the edges crossed by the short segment
+# from that reference point, which keeps the exact test to a handful of edges.
+class CountryLocator:
+    def __init__(self, names, continents, resolution, cell_country, cell_slots, slot_country, slot_ref, slot_ref_inside, slot_edges, edges):
+        self.names = np.asarray(names, dtype=object)
+        self.continents = np.asarray(continents, dtype=object)
+        self.resolution = float(resolution)
+        self.nx = int(round(360 / self.resolution))
+        self.ny = int(round(180 / self.resolution))
+        self.cell_country = cell_country
+        self.cell_slots = cell_slots
+        self.slot_country = slot_country
+        self.slot_ref = slot_ref
+        self.slot_ref_inside = slot_ref_inside
+        self.slot_edges = slot_edges
+        self.edges = edges
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        ix = np.clip(np.floor((lon + 180) / self.resolution), 0, self.nx - 1).astype(np.int64)
+        iy = np.clip(np.floor((lat + 90) / self.resolution), 0, self.ny - 1).astype(np.int64)
+        return ix, iy
+
+    # Function to build the locator from a GeoJSON boundary file
+    @classmethod
+    def from_geojson(cls, filename: str, resolution: float = 0.5) -> "CountryLocator":
+        names, continents, edges, edge_country = read_boundaries(filename)
+        locator = cls(names, continents, resolution, None, None, None, None, None, None, edges)
+        nx, ny = locator.nx, locator.ny
+
+        # Cells touched by each edge's bounding box (a superset of the cells it crosses)
+        ix0, iy0 = locator._cells(np.minimum(edges[:, 1], edges[:, 3]), np.minimum(edges[:, 0], edges[:, 2]))
+        ix1, iy1 = locator._cells(np.maximum(edges[:, 1], edges[:, 3]), np.maximum(edges[:, 0], edges[:, 2]))
+        width, height = ix1 - ix0 + 1, iy1 - iy0 + 1
+        edge_ids = np.repeat(np.arange(len(edges)), width * height)
+        offset = np.arange(len(edge_ids)) - np.repeat(np.cumsum(width * height) - width * height, width * height)
+        pair_cell = (iy0[edge_ids] + offset // width[edge_ids]) * nx + ix0[edge_ids] + offset % width[edge_ids]
+        pair_country = edge_country[edge_ids]
+        order = np.lexsort((edge_ids, pair_country, pair_cell))
+        pair_cell, pair_country, edge_ids = pair_cell[order], pair_country[order], edge_ids[order]
+
+        # Reference point per cell: its centre, nudged if it happens to sit on an edge
+        cells = np.arange(nx * ny)
+        ref = np.column_stack([(cells % nx + 0.5) * resolution - 180, (cells // nx + 0.5) * resolution - 90])
+        on_edge = _on_edge(ref[pair_cell, 0], ref[pair_cell, 1], *edges[edge_ids].T)
+        for cell in np.unique(pair_cell[on_edge]):
+            cell_edges = edges[edge_ids[pair_cell == cell]]
+            for nudge in (0.25, 0.125, 0.375, 0.0625):
+                candidate = ref[cell] + np.array([nudge, nudge * 0.618]) * resolution
+                if not _on_edge(candidate[0], candidate[1], *cell_edges.T).any():
+                    ref[cell] = candidate
+                    break
+
+        # Exact inside test of every reference point against the countries whose bbox holds it
+        inside_pairs = []
+        for code in range(len(names)):
+            country_edges = edges[edge_country == code]
+            lo, hi = country_edges[:, [0, 1]].min(axis=0), country_edges[:, [0, 1]].max(axis=0)
+            lo, hi = np.minimum(lo, country_edges[:, [2, 3]].min(axis=0)), np.maximum(hi, country_edges[:, [2, 3]].max(axis=0))
+            in_box = np.flatnonzero((ref[:, 0] >= lo[0]) & (ref[:, 0] <= hi[0]) & (ref[:, 1] >= lo[1]) & (ref[:, 1] <= hi[1]))
+            hits = in_box[_ray_parity(ref[in_box, 0], ref[in_box, 1], country_edges)]
+            inside_pairs.append(np.column_stack([hits, np.full(len(hits), code)]))
+        inside_pairs = np.vstack(inside_pairs)
+
+        # Cells without boundaries resolve directly; the rest get one slot per candidate country
+        cell_country = np.full(nx * ny, _NONE, dtype=np.int32)
+        cell_country[inside_pairs[:, 0]] = inside_pairs[:, 1]
+        boundary_inside = inside_pairs[np.isin(inside_pairs[:, 0], pair_cell)]
+        slot_keys = np.unique(np.concatenate([
+            pair_cell * len(names) + pair_country,
+            boundary_inside[:, 0].astype(np.int64) * len(names) + boundary_inside[:, 1],
+        ]))
+        slot_cell, slot_country = slot_keys // len(names), (slot_keys % len(names)).astype(np.int32)
+        cell_country[np.unique(slot_cell)] = _MIXED
+        cell_slots = np.searchsorted(slot_cell, np.arange(nx * ny + 1)).astype(np.int64)
+        inside_keys = np.sort(inside_pairs[:, 0].astype(np.int64) * len(names) + inside_pairs[:, 1])
+        position = np.searchsorted(inside_keys, slot_keys)
+        slot_ref_inside = inside_keys[np.minimum(position, len(inside_keys) - 1)] == slot_keys
+        pair_slot = np.searchsorted(slot_keys, pair_cell * len(names) + pair_country)
+        slot_edges = np.searchsorted(pair_slot, np.arange(len(slot_keys) + 1)).astype(np.int64)
+
+        locator.cell_country = cell_country
+        locator.cell_slots = cell_slots
+        locator.slot_country = slot_country
+        locator.slot_ref = ref[slot_cell]
+        locator.slot_ref_inside = slot_ref_inside
+        locator.slot_edges = np.column_stack([slot_edges[:-1], slot_edges[1:]])
+        locator.edges = edges[edge_ids]
+        return locator
+
+    # Function to save the prebuilt index
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            np.savez(f, names=self.names.astype(str), continents=self.continents.astype(str), resolution=self.resolution,
+                     cell_country=self.cell_country, cell_slots=self.cell_slots, slot_country=self.slot_country, slot_ref=self.slot_ref,
+                     slot_ref_inside=self.slot_ref_inside, slot_edges=self.slot_edges, edges=self.edges)
+
+    # Function to load a prebuilt index
+    @classmethod
+    def load(cls, path: str) -> "CountryLocator":
+        with np.load(path) as f:
+            return cls(f['names'], f['continents'], f['resolution'], f['cell_country'], f['cell_slots'], f['slot_country'],
+                       f['slot_ref'], f['slot_ref_inside'], f['slot_edges'], f['edges'])
+
+    # Function to locate points in bulk. Returns the country code per point (-1 when none)
+    # and its status (INSIDE, OCEAN, BORDER or INVALID).
+    def locate(self, lat, lon) -> tuple[np.ndarray, np.ndarray]:
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        ix, iy = self._cells(np.where(valid, lat, 0), np.where(valid, lon, 0))
+        cell = iy * self.nx + ix
+        code = self.cell_country[cell].copy()
+        status = np.where(code >= 0, INSIDE, OCEAN).astype(np.uint8)
+        status[~valid] = INVALID
+        code[~valid] = _NONE
+
+        mixed = np.flatnonzero(valid & (code == _MIXED))
+        code[mixed] = _NONE
+        if len(mixed):
+            self._locate_mixed(mixed, lat[mixed], lon[mixed], cell[mixed], code, status)
+        return code, status
+
+    def _locate_mixed(self, points, lat, lon, cell, code, status) -> None:
+        # Expand each point into its cell's slots, then each slot into its edges
+        first, last = self.cell_slots[cell], self.cell_slots[cell + 1]
+        counts = last - first
+        pair_point = np.repeat(np.arange(len(points)), counts)
+        pair_slot = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        edge_first, edge_last = self.slot_edges[pair_slot, 0], self.slot_edges[pair_slot, 1]
+        edge_counts = edge_last - edge_first
+        pair = np.repeat(np.arange(len(pair_slot)), edge_counts)
+        edge = np.repeat(edge_first - np.cumsum(edge_counts) + edge_counts, edge_counts) + np.arange(edge_counts.sum())
+
+        ax, ay, bx, by = self.edges[edge].T
+        px, py = lon[pair_point[pair]], lat[pair_point[pair]]
+        cx, cy = self.slot_ref[pair_slot[pair]].T
+        dx, dy = px - cx, py - cy
+
+        # Crossings of the segment reference -> point, counting vertices on the line as below it
+        side_a = dx * (ay - cy) - dy * (ax - cx)
+        side_b = dx * (by - cy) - dy * (bx - cx)
+        straddle = (side_a > 0) != (side_b > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((ax - cx) * (by - ay) - (ay - cy) * (bx - ax)) / (dx * (by - ay) - dy * (bx - ax))
+        crossing = straddle & (t > 0) & (t < 1)
+        touching = (straddle & (t == 1)) | _on_edge(px, py, ax, ay, bx, by)
+
+        parity = np.bincount(pair, weights=crossing, minlength=len(pair_slot)).astype(np.int64) % 2 == 1
+        on_boundary = np.bincount(pair, weights=touching, minlength=len(pair_slot)) > 0
+        inside = (self.slot_ref_inside[pair_slot] != parity) | on_boundary
+
+        hits = np.bincount(pair_point, weights=inside, minlength=len(points))
+        on_line = np.bincount(pair_point, weights=on_boundary, minlength=len(points)) > 0
+        # First matching country per point (slots are ordered by country code)
+        matched = np.flatnonzero(inside)
+        first_match = np.full(len(points), -1, dtype=np.int64)
+        first_match[pair_point[matched[::-1]]] = self.slot_country[pair_slot[matched[::-1]]]
+
+        code[points] = first_match
+        status[points] = np.where(hits == 0, OCEAN, np.where((hits > 1) | on_line, BORDER, INSIDE))
+
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+# Bump when the prebuilt proximity index layout changes
+PROXIMITY_FORMAT = 1
+# Height of the latitude bands of the proximity index, in degrees, for this many landings
+# (denser tables get thinner bands, so a band holds about as many landings per degree)
+PROXIMITY_BAND = 0.5
+PROXIMITY_BAND_POINTS = 50_000
+# Candidate (query, landing) pairs checked at once by batched queries, to bound memory
+PROXIMITY_BLOCK = 1 << 22
+# Smallest starting radius of k-nearest queries; they grow it by this factor, trying this many steps at once
+PROXIMITY_START_KM = 0.1
+PROXIMITY_GROWTH = 1.5
+PROXIMITY_LADDER = 6
+
+
+# Function to convert latitudes/longitudes in degrees to points on the unit sphere
+def unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    phi, lam = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+
+
+# Half-widths, in cells, of the squares tried by ProximityIndex._radius_estimate
+_ESTIMATE_SIZES = np.unique(np.round(1.5 ** np.arange(16)).astype(np.int64) - 1)
+
+
+# Function to keep the matches (offsets, points, km) of the selected queries only
+def _select(offsets: np.ndarray, points: np.ndarray, km: np.ndarray, selected: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    counts = np.diff(offsets)[selected]
+    starts = offsets[:-1][selected]
+    picked = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return np.concatenate([[0], np.cumsum(counts)]), points[picked], km[picked]
+
+
+# Proximity search over landing positions.
+# Landings are sorted by latitude band, then by longitude, keeping their position as a unit
+# vector. A radius query only visits the bands covered by the spherical cap around the point,
+# taking from each the contiguous run of landings within the cap's longitude range, then checks
+# the exact great-circle distance of the landings in them; a k-nearest query grows its radius
+# until k landings are inside.
+class ProximityIndex:
+    def __init__(self, band, rows, keys, xyz):
+        self.band = float(band)
+        self.bands = int(round(180 / self.band))
+        self.rows = rows
+        self.keys = keys
+        self.xyz = xyz
+
+    def _bands(self, lat: np.ndarray) -> np.ndarray:
+        return np.minimum(np.maximum((lat + 90) // self.band, 0), self.bands - 1).astype(np.int64)
+
+    # Sort key of a position: its band, then its longitude shifted to 0..360
+    @staticmethod
+    def _keys(band: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        return band * 512.0 + (lon + 180)
+
+    # Function to build the index over row positions 0..n-1. Rows with missing or out-of-range
+    # coordinates, or at (0, 0) (an unknown position in the meteorite data), are left out.
+    @classmethod
+    def from_points(cls, lat, lon, band: float | None = None) -> "ProximityIndex":
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & ~((lat == 0) & (lon == 0))
+        if band is None:
+            band = 180 / round(180 / (PROXIMITY_BAND * min(1.0, np.sqrt(PROXIMITY_BAND_POINTS / max(valid.sum(), 1)))))
+        index = cls(band, np.flatnonzero(valid), None, None)
+        keys = cls._keys(index._bands(lat[index.rows]), lon[index.rows])
+        order = np.argsort(keys, kind='stable')
+        index.rows, index.keys = index.rows[order], keys[order]
+        index.xyz = unit_vectors(lat[index.rows], lon[index.rows])
+        return index
+
+    # Function to save the prebuilt index
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            np.savez(f, band=self.band, rows=self.rows, keys=self.keys, xyz=self.xyz)
+
+    # Function to load a prebuilt index
+    @classmethod
+    def load(cls, path: str) -> "ProximityIndex":
+        with np.load(path) as f:
+            return cls(f['band'], f['rows'], f['keys'], f['xyz'])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # Function to get the landings near the cap of angle theta around each point, as (query, first, count)
+    # runs: the bands of the cap's latitude range, within its longitude half-width (the whole circle once
+    # it reaches a pole), as one run per band, or two where the range wraps around the antimeridian
+    def _cap_spans(self, lat: np.ndarray, lon: np.ndarray, theta: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        dlat = np.degrees(theta)
+        iy0, iy1 = self._bands(lat - dlat), self._bands(lat + dlat)
+        polar = np.radians(np.abs(lat)) + theta >= np.pi / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            half = np.degrees(np.arcsin(np.clip(np.sin(theta) / np.cos(np.radians(lat)), 0, 1)))
+        half = np.where(polar | (half >= 180), 180.0, half)
+        west, east = lon - half, lon + half
+        full = half >= 180
+        # Longitude ranges as 0..360 offsets: the main one, and the part wrapped around the antimeridian
+        lo = np.where(full, 0.0, np.maximum(west, -180) + 180)
+        hi = np.where(full, 360.0, np.minimum(east, 180) + 180)
+        wrap_lo = np.where(~full & (west < -180), west + 540, np.where(~full & (east > 180), 0.0, np.inf))
+        wrap_hi = np.where(~full & (west < -180), 360.0, np.where(~full & (east > 180), east - 180, -np.inf))
+
+        band = iy1 - iy0 + 1
+        query = np.repeat(np.arange(len(lat)), band)
+        base = (iy0[query] + np.arange(band.sum()) - np.repeat(np.cumsum(band) - band, band)) * 512.0
+        starts = np.concatenate([base + lo[query], base + wrap_lo[query]])
+        stops = np.concatenate([base + hi[query], base + wrap_hi[query]])
+        first = np.searchsorted(self.keys, starts, side='left')
+        counts = np.maximum(np.searchsorted(self.keys, stops, side='right') - first, 0)
+        keep = counts > 0
+        return np.concatenate([query, query])[keep], first[keep], counts[keep]
+
+    # Function to get the landings near the cap around each point with their distances, as (offsets, points, km)
+    # sorted by query then distance; only those within the cap unless keep_all (then every landing visited)
+    def _search(self, lat: np.ndarray, lon: np.ndarray, theta: np.ndarray, keep_all: bool = False) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & (theta >= 0)
+        queries = np.flatnonzero(valid)
+        query, first, counts = self._cap_spans(lat[queries], lon[queries], theta[queries])
+        query = queries[query]
+
+        # Exact distance checks, a block of candidate pairs at a time
+        center = unit_vectors(lat, lon)
+        chord_limit = np.inf if keep_all else (2 * np.sin(theta / 2)) ** 2
+        chord_limit = np.broadcast_to(chord_limit, lat.shape)
+        ends = np.cumsum(counts)
+        matched_query, matched_point, matched_d2 = [], [], []
+        start = 0
+        while start < len(counts):
+            stop = max(start + 1, int(np.searchsorted(ends, ends[start] - counts[start] + PROXIMITY_BLOCK, side='right')))
+            block_counts = counts[start:stop]
+            pair_query = np.repeat(query[start:stop], block_counts)
+            pair_point = np.repeat(first[start:stop] - np.cumsum(block_counts) + block_counts, block_counts) + np.arange(block_counts.sum())
+            d2 = ((self.xyz[pair_point] - center[pair_query]) ** 2).sum(axis=1)
+            keep = d2 <= chord_limit[pair_query]
+            matched_query.append(pair_query[keep])
+            matched_point.append(pair_point[keep])
+            matched_d2.append(d2[keep])
+            start = stop
+
+        matched_query = np.concatenate(matched_query or [np.empty(0, dtype=np.int64)])
+        matched_point = np.concatenate(matched_point or [np.empty(0, dtype=np.int64)])
+        km = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(np.concatenate(matched_d2 or [np.empty(0)])) / 2, 1.0))
+        order = np.lexsort((km, matched_query))
+        offsets = np.searchsorted(matched_query[order], np.arange(len(lat) + 1))
+        return offsets, matched_point[order], km[order]
+
+    # Function to find the landings within radius_km of each query point, in batch.
+    # Returns (offsets, rows, km): the matches of query i are rows[offsets[i]:offsets[i + 1]],
+    # nearest first, with their distances in km.
+    def within_batch(self, lat, lon, radius_km) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        theta = np.minimum(np.broadcast_to(np.asarray(radius_km, dtype=np.float64), lat.shape) / EARTH_RADIUS_KM, np.pi)
+        offsets, points, km = self._search(lat, lon, theta)
+        return offsets, self.rows[points], km
+
+    # Function to estimate the radius holding k landings around each point, from the landing density
+    # of the smallest square of (band, degree of longitude) cells around it that holds k of them
+    def _radius_estimate(self, lat: np.ndarray, lon: np.ndarray, k: int) -> np.ndarray:
+        if not hasattr(self, '_summed_counts'):
+            cells = (self.keys // 512).astype(np.int64) * 360 + np.minimum(self.keys % 512, 359).astype(np.int64)
+            counts = np.bincount(cells, minlength=self.bands * 360).reshape(self.bands, 360)
+            self._summed_counts = np.zeros((self.bands + 1, 361), dtype=np.int64)
+            self._summed_counts[1:, 1:] = counts.cumsum(axis=0).cumsum(axis=1)
+        table = self._summed_counts
+
+        iy = self._bands(lat)[:, None]
+        ix = np.clip(np.floor(lon + 180), 0, 359).astype(np.int64)[:, None]
+        sizes = _ESTIMATE_SIZES[None, :]
+        y0, y1 = np.maximum(iy - sizes, 0), np.minimum(iy + sizes, self.bands - 1) + 1
+        # Longitudes past the antimeridian are left out of the count (this is only an estimate)
+        x0, x1 = np.maximum(ix - sizes, 0), np.minimum(ix + sizes, 359) + 1
+        counts = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        size = np.minimum((counts >= k).argmax(axis=1), sizes.shape[1] - 1)
+        picked = np.arange(len(lat)), size
+        cell_km = np.pi / 180 * EARTH_RADIUS_KM
+        area = (y1 - y0)[picked] * self.band * cell_km * (x1 - x0)[picked] * cell_km * np.maximum(np.cos(np.radians(lat)), 0.05)
+        density = np.maximum(counts[picked], 1) / area
+        return np.clip(np.sqrt(k / (np.pi * density)), PROXIMITY_START_KM, np.pi * EARTH_RADIUS_KM)
+
+    # Function to find the k nearest landings to each query point, in batch.
+    # Returns (rows, km) of shape (n, k), nearest first, padded with -1 / inf when fewer exist.
+    def nearest_batch(self, lat, lon, k: int) -> tuple[np.ndarray, np.ndarray]:
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        rows = np.full((len(lat), k), -1, dtype=np.int64)
+        km = np.full((len(lat), k), np.inf)
+        wanted = min(k, len(self))
+        pending = np.flatnonzero((np.abs(lat) <= 90) & (np.abs(lon) <= 180))
+        if wanted == 0 or len(pending) == 0:
+            return rows, km
+
+        # Grow each radius over a ladder of steps, counting only the landings of the bands the cap
+        # covers (cheap, no distances), up to the first radius whose bands hold k landings
+        radius = self._radius_estimate(lat[pending], lon[pending], wanted) / PROXIMITY_GROWTH ** 2
+        ladder = PROXIMITY_GROWTH ** np.arange(PROXIMITY_LADDER)
+        searched, searched_radius = [], []
+        while len(pending):
+            radii = np.minimum(radius[:, None] * ladder, np.pi * EARTH_RADIUS_KM)
+            query, _, counts = self._cap_spans(np.repeat(lat[pending], len(ladder)), np.repeat(lon[pending], len(ladder)), radii.ravel() / EARTH_RADIUS_KM)
+            enough = (np.bincount(query, weights=counts, minlength=radii.size).reshape(radii.shape) >= wanted) | (radii >= np.pi * EARTH_RADIUS_KM)
+            ready = enough.any(axis=1)
+            searched.append(pending[ready])
+            searched_radius.append(radii[np.arange(len(pending)), enough.argmax(axis=1)][ready])
+            pending, radius = pending[~ready], radii[~ready, -1] * PROXIMITY_GROWTH
+        searched, radius = np.concatenate(searched), np.concatenate(searched_radius)
+
+        # The k-th closest of the landings in those bands bounds the distance of the true k-th nearest:
+        # when it lies within the cap, these are the k nearest. Otherwise the radius is grown from the
+        # landings found inside the cap (as they spread over its area), never past that bound
+        offsets, points, found_km = self._search(lat[searched], lon[searched], radius / EARTH_RADIUS_KM, keep_all=True)
+        bound = found_km[np.minimum(offsets[:-1] + wanted - 1, len(found_km) - 1)]
+        done = bound <= radius
+        self._fill_nearest(rows, km, searched[done], *_select(offsets, points, found_km, done))
+        inside = np.bincount(np.repeat(np.arange(len(searched)), np.diff(offsets)), weights=found_km <= np.repeat(radius, np.diff(offsets)), minlength=len(searched))
+        searched, radius, bound, inside = searched[~done], radius[~done], bound[~done], inside[~done]
+        while len(searched):
+            radius = np.where(inside > 0, np.minimum(radius * PROXIMITY_GROWTH * np.sqrt(wanted / np.maximum(inside, 1)), bound), bound)
+            offsets, points, found_km = self._search(lat[searched], lon[searched], radius * (1 + 1e-9) / EARTH_RADIUS_KM + 1e-12)
+            inside = np.diff(offsets)
+            done = (inside >= wanted) | (radius >= bound)
+            self._fill_nearest(rows, km, searched[done], *_select(offsets, points, found_km, done))
+            searched, radius, bound, inside = searched[~done], radius[~done], bound[~done], inside[~done]
+        return rows, km
+
+    # Function to copy the first k matches of each query (nearest first) into the rows/km result arrays
+    def _fill_nearest(self, rows: np.ndarray, km: np.ndarray, queries: np.ndarray, offsets: np.ndarray, points: np.ndarray, found_km: np.ndarray) -> None:
+        take = np.minimum(np.diff(offsets), rows.shape[1])
+        column = np.arange(take.sum()) - np.repeat(np.cumsum(take) - take, take)
+        source = np.repeat(offsets[:-1], take) + column
+        target = np.repeat(queries, take)
+        rows[target, column] = self.rows[points[source]]
+        km[target, column] = found_km[source]
+
+    # Function to find the landings within radius_km of a point, as (rows, km), nearest first
+    def within(self, lat: float, lon: float, radius_km: float) -> tuple[np.ndarray, np.ndarray]:
+        _, rows, km = self.within_batch(lat, lon, radius_km)
+        return rows, km
+
+    # Function to find the k nearest landings to a point, as (rows, km), nearest first
+    def nearest(self, lat: float, lon: float, k: int) -> tuple[np.ndarray, np.ndarray]:
+        rows, km = self.nearest_batch(lat, lon, k)
+        found = rows[0] >= 0
+        return rows[0][found], km[0][found]
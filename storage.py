@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Callable
+
+# Kept free of third-party imports: every module that stores artifacts imports this one, perf and assets included
+
+# Folder of the app: main.py, the data files and this module
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Directory holding everything derived from the source files
+ARTIFACTS_DIR = 'artifacts'
+
+
+# Function to set up a process that uses the app modules without a Streamlit server (bake, benchmarks, tests):
+# it runs from the app folder so the data, boundaries and artifacts paths resolve as in the app, can import
+# the app modules, and does not log the bare-mode warnings of Streamlit's cached functions
+def use_app_root() -> None:
+    os.chdir(APP_ROOT)
+    if APP_ROOT not in sys.path:
+        sys.path.insert(0, APP_ROOT)
+    from streamlit import logger
+
+    logger.set_log_level('error')
+
+
+# Function to hash the content of a file
+def file_hash(filename: str) -> str:
+    with open(filename, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+# Function to write a file atomically so readers never see a partial artifact.
+# `write` fills a temporary file next to `path` (unique per process and thread), which then
+# replaces `path` in one step; it is removed if the write fails.
+def write_atomic(path: str, write: Callable[[str], None]) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Function to write data as indented JSON, atomically
+def write_json(path: str, data) -> None:
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    write_atomic(path, write)
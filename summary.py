@@ -0,0 +1,233 @@
+import json
+import os
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+from storage import ARTIFACTS_DIR, write_atomic
+
+# Values kept per numeric column for approximate quantiles (exact below this many rows)
+QUANTILE_SAMPLE = 20_000
+# Distinct values tracked per categorical column for top/freq (exact below this many)
+HEAVY_HITTERS = 1_000
+# Hashes kept per column for the distinct-count estimate (exact up to this many distinct values, 512 KiB a column)
+DISTINCT_SAMPLE = 65_536
+
+# Rows per chunk fed to the running summaries
+SUMMARY_CHUNK_ROWS = 100_000
+
+SUMMARIES_DIR = os.path.join(ARTIFACTS_DIR, 'summaries')
+# Bump when the summary rows or the way they are computed change, so stored summaries are rebuilt
+SUMMARY_FORMAT = 2
+
+SUMMARY_ROWS = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+# Running summary of a numeric (or datetime) column, fed one chunk at a time.
+# Mean and variance are merged with the parallel form of Welford's update, and quantiles
+# come from a bounded uniform sample (values with the smallest random keys are kept).
+class NumericSummary:
+    def __init__(self, sample_size: int = QUANTILE_SAMPLE, seed: int = 0):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sample = np.empty(0)
+        self.keys = np.empty(0)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        count, mean = len(values), values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        keys = np.concatenate([self.keys, self.rng.random(count)])
+        sample = np.concatenate([self.sample, values])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, sample = keys[keep], sample[keep]
+        self.keys, self.sample = keys, sample
+
+    def result(self) -> dict:
+        if self.count == 0:
+            return {'count': 0}
+        quantiles = np.quantile(self.sample, QUANTILES)
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan,
+            'min': self.min,
+            **{f"{q:.0%}": value for q, value in zip(QUANTILES, quantiles)},
+            'max': self.max,
+        }
+
+
+# Running summary of a categorical column, fed one chunk at a time.
+# Counts are exact until more than `capacity` distinct values are seen; after that only the
+# heaviest values are kept. Distinct values are estimated from the smallest value hashes.
+class CategoricalSummary:
+    def __init__(self, capacity: int = HEAVY_HITTERS, distinct_sample: int = DISTINCT_SAMPLE):
+        self.capacity = capacity
+        self.distinct_sample = distinct_sample
+        self.count = 0
+        self.counts = pd.Series(dtype='int64')
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.pruned = False
+
+    def update(self, values: pd.Series) -> None:
+        values = values.dropna()
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        counts = values.astype(str).value_counts()
+        merged = self.counts.add(counts, fill_value=0).astype('int64')
+        # Distinct values are hashed only once the exact counts no longer hold them all
+        if self.pruned:
+            self._add_hashes(counts.index)
+        elif len(merged) > self.capacity:
+            self._add_hashes(merged.index)
+            self.pruned = True
+        self.counts = merged.nlargest(self.capacity) if len(merged) > self.capacity else merged
+
+    def _add_hashes(self, values: pd.Index) -> None:
+        hashes = np.union1d(self.hashes, pd.util.hash_array(values.to_numpy(dtype=object)))
+        self.hashes = hashes[:self.distinct_sample]
+
+    def result(self) -> dict:
+        if self.count == 0:
+            return {'count': 0}
+        if not self.pruned:
+            unique = len(self.counts)
+        elif len(self.hashes) < self.distinct_sample:
+            unique = len(self.hashes)
+        else:
+            # An estimate, which can never exceed the number of values seen
+            unique = min(int(round((self.distinct_sample - 1) / (float(self.hashes[-1]) / 2.0 ** 64))), self.count)
+        ordered = self.counts.sort_values(ascending=False, kind='stable')
+        return {'count': self.count, 'unique': unique, 'top': ordered.index[0], 'freq': int(ordered.iloc[0])}
+
+
+def _summary_for(series: pd.Series):
+    if pd.api.types.is_bool_dtype(series) or not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+        return CategoricalSummary()
+    return NumericSummary()
+
+
+def _numeric_values(series: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype='datetime64[ns]').astype('int64').astype(np.float64)
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+# Function to summarize a stream of data frame chunks in one pass, in the layout of describe(include='all')
+def summarize_chunks(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    summaries: dict = {}
+    dtypes: dict = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            series = chunk[column]
+            if column not in summaries:
+                summaries[column] = _summary_for(series)
+                dtypes[column] = series.dtype
+            summary = summaries[column]
+            summary.update(_numeric_values(series) if isinstance(summary, NumericSummary) else series)
+
+    table = {}
+    for column, summary in summaries.items():
+        result = summary.result()
+        if pd.api.types.is_datetime64_any_dtype(dtypes[column]):
+            result = {key: value if key == 'count' else pd.Timestamp(int(value)) for key, value in result.items() if key != 'std'}
+        table[column] = result
+    rows = [row for row in SUMMARY_ROWS if any(row in result for result in table.values())]
+    return pd.DataFrame(table, index=rows, dtype=object)
+
+
+# Function to summarize a data frame, reading it in chunks of rows
+def summarize(df: pd.DataFrame, chunk_rows: int = SUMMARY_CHUNK_ROWS) -> pd.DataFrame:
+    return summarize_chunks(df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+
+
+# Function to regroup a stream of data frames into frames of exactly chunk_rows rows (the last one
+# may be shorter). Summaries of the regrouped stream match summarize() of the concatenated frames.
+def rechunk(frames: Iterable[pd.DataFrame], chunk_rows: int = SUMMARY_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    pending, rows = [], 0
+    for frame in frames:
+        while len(frame):
+            piece = frame.iloc[:chunk_rows - rows]
+            frame = frame.iloc[len(piece):]
+            pending.append(piece)
+            rows += len(piece)
+            if rows == chunk_rows:
+                yield pd.concat(pending) if len(pending) > 1 else pending[0]
+                pending, rows = [], 0
+    if pending:
+        yield pd.concat(pending) if len(pending) > 1 else pending[0]
+
+
+# Function to summarize a CSV file too large to load at once
+def summarize_csv(filename: str, chunk_rows: int = SUMMARY_CHUNK_ROWS) -> pd.DataFrame:
+    return summarize_chunks(pd.read_csv(filename, chunksize=chunk_rows))
+
+
+# Summary cells are Python/NumPy scalars, strings, NaN or timestamps (tagged to be read back as such)
+def _encode_cell(value):
+    if isinstance(value, pd.Timestamp):
+        return {'timestamp': value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__} in a summary")
+
+
+def _decode_cell(value: dict):
+    return pd.Timestamp(value['timestamp']) if 'timestamp' in value else value
+
+
+# Function to write a summary table as JSON
+def write_summary(path: str, table: pd.DataFrame) -> None:
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, 'w') as f:
+            json.dump({'index': list(table.index), 'columns': list(table.columns), 'data': table.values.tolist()}, f, default=_encode_cell)
+
+    write_atomic(path, write)
+
+
+# Function to read a summary table written by write_summary
+def read_summary(path: str) -> pd.DataFrame:
+    with open(path) as f:
+        table = json.load(f, object_hook=_decode_cell)
+    return pd.DataFrame(table['data'], index=table['index'], columns=table['columns'], dtype=object)
+
+
+# Function to load the summary of a dataset version, computing and storing it on first use
+def load_summary(df: pd.DataFrame, version: str) -> pd.DataFrame:
+    path = os.path.join(SUMMARIES_DIR, f"summary-v{SUMMARY_FORMAT}-{version}.json")
+    if os.path.exists(path):
+        return read_summary(path)
+    table = summarize(df)
+    write_summary(path, table)
+    return table
+
+
+# Function to get the summary of a dataset, computed once per dataset version
+@perf.timed('dataset_summary', cached=True)
+@st.cache_data()
+def dataset_summary(_df: pd.DataFrame, version: str) -> pd.DataFrame:
+    perf.cache_miss()
+    return load_summary(_df, version)
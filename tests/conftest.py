@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app modules sit in the folder above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import use_app_root
+
+use_app_root()
@@ -0,0 +1,26 @@
+import glob
+import os
+
+import assets
+
+
+def test_gallery_lists_the_folders_once_per_process(monkeypatch):
+    calls, list_folder = [], glob.glob
+    monkeypatch.setattr(glob, 'glob', lambda pattern: calls.append(pattern) or list_folder(pattern))
+    assets.asset_manifest.clear()
+    for _ in range(3):
+        qc = assets.images('screenshots/qc_screen')
+        cst = assets.images('screenshots/cst_screen')
+    assert qc and cst
+    assert calls == list(assets.ASSET_VARIANTS)
+    assets.asset_manifest.clear()
+
+
+def test_images_without_a_manifest_are_served_as_is(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, 'MANIFEST_FILE', str(tmp_path / 'manifest.json'))
+    assets.asset_manifest.clear()
+    screenshots = assets.images('screenshots/')
+    assert screenshots == sorted(path.replace(os.sep, '/') for path in glob.glob('screenshots/*.png'))
+    assert [assets.asset(source, 'thumb') for source in screenshots] == screenshots
+    assert assets.asset('Logo.png', 'small') == 'Logo.png'
+    assets.asset_manifest.clear()
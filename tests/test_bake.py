@@ -0,0 +1,37 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import bake
+import charts
+
+PROJECT_1 = 'Project 1: Meteorite Landings'
+
+
+def _project_1_figure_cache():
+    charts.figure_cache.clear()
+    at = AppTest.from_file(os.path.join(os.getcwd(), 'main.py'), default_timeout=120)
+    at.run()
+    at.sidebar.radio[0].set_value(PROJECT_1).run()
+    assert not at.exception
+    return charts.figure_cache()
+
+
+def test_project_1_is_drawn_from_baked_figures(tmp_path, monkeypatch):
+    monkeypatch.setattr(charts, 'FIGURES_DIR', str(tmp_path))
+    result = bake.bake_figures()
+    assert result['figures'] == len(os.listdir(tmp_path))
+
+    cache = _project_1_figure_cache()
+    assert cache.misses == 0
+    assert cache.hits == len(charts.CUBE_FIGURES) + 1
+
+
+def test_figures_baked_by_other_chart_code_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(charts, 'FIGURES_DIR', str(tmp_path))
+    bake.bake_figures()
+    monkeypatch.setattr(charts, 'FIGURE_VERSION', 'v0.00000000')
+
+    cache = _project_1_figure_cache()
+    assert cache.hits == 0
+    assert cache.misses == len(charts.CUBE_FIGURES) + 1
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import charts
+
+
+@pytest.mark.parametrize('focus', charts.MAP_FOCUS)
+def test_viewport_spans_the_map_height_on_the_mercator_world(focus):
+    lat, lon, zoom = charts.MAP_FOCUS[focus]
+    size = 512 * 2 ** zoom
+    lat_min, lat_max, _, _ = charts.viewport(lat, lon, zoom)
+    # Each edge is half the map height from the centre, unless the world ends first (then it reaches the pole)
+    y = charts.mercator_y(lat, size)
+    top = y - charts.MAP_HEIGHT / 2
+    bottom = y + charts.MAP_HEIGHT / 2
+    if top <= 0:
+        assert lat_max == 90.0
+    else:
+        assert charts.mercator_y(lat_max, size) == pytest.approx(top)
+    if bottom >= size:
+        assert lat_min == -90.0
+    else:
+        assert charts.mercator_y(lat_min, size) == pytest.approx(bottom)
+    assert lat_min < lat < lat_max
+
+
+def test_viewport_of_the_europe_preset():
+    lat_min, lat_max, lon_min, lon_max = charts.viewport(*charts.MAP_FOCUS['Europe'])
+    assert (lat_min, lat_max) == pytest.approx((13.826, 70.812), abs=1e-3)
+    assert (lon_min, lon_max) == pytest.approx((-33.34, 63.34), abs=1e-2)
+
+
+def test_viewport_of_the_world_covers_everything():
+    assert charts.viewport(0, 0, 0) == (-90.0, 90.0, -180.0, 180.0)
+
+
+def test_mercator_round_trip():
+    for lat in (-85.0, -60.5, -1.0, 0.0, 13.8, 50.0, 84.9):
+        assert charts.mercator_lat(charts.mercator_y(lat, 4096), 4096) == pytest.approx(lat)
+
+
+def test_class_filter_picked_in_any_order_reuses_the_figures(tmp_path, monkeypatch):
+    monkeypatch.setattr(charts, 'FIGURES_DIR', str(tmp_path))
+    charts.figure_cache.clear()
+    at = AppTest.from_file(os.path.join(os.getcwd(), 'main.py'), default_timeout=120)
+    at.run()
+    at.sidebar.radio[0].set_value('Project 1: Meteorite Landings').run()
+    at.sidebar.multiselect[0].set_value(['L6', 'H5']).run()
+    assert not at.exception
+    misses = charts.figure_cache().misses
+    at.sidebar.multiselect[0].set_value(['H5', 'L6']).run()
+    assert not at.exception
+    assert charts.figure_cache().misses == misses
+    charts.figure_cache.clear()
@@ -0,0 +1,21 @@
+import gc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import datasets
+
+
+def test_read_frame_keeps_null_free_numeric_columns_on_the_map(tmp_path):
+    rows = 1_000_000
+    df = pd.DataFrame({'id': np.arange(rows), 'mass (g)': np.linspace(0, 1, rows), 'year': [np.nan] + [1880.0] * (rows - 1)})
+    path = str(tmp_path / 'frame.arrow')
+    datasets.write_frame(path, df)
+    gc.collect()
+    before = pa.total_allocated_bytes()
+    frame = datasets.read_frame(path)
+    allocated = pa.total_allocated_bytes() - before
+    pd.testing.assert_frame_equal(frame, df)
+    # Only the column with nulls is copied onto the heap (to fill them with NaN)
+    assert allocated < 2 * df['year'].nbytes
@@ -0,0 +1,53 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+import exports
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame({'name': ['Aachen', 'Aarhus', 'Abee'], 'mass (g)': [21.0, 720.0, 107000.0], 'year': [1880, 1951, 1952]})
+
+
+def _read(data: bytes, fmt: str) -> pd.DataFrame:
+    if fmt == 'Parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    return pd.read_csv(io.BytesIO(gzip.decompress(data) if fmt == 'CSV (gzip)' else data))
+
+
+@pytest.mark.parametrize('fmt', exports.EXPORT_FORMATS)
+def test_filtered_exports_are_not_stored(fmt, tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, 'EXPORTS_DIR', str(tmp_path))
+    df = _frame()
+    data = exports.deferred_export(df.iloc[1:], fmt, 'Meteorite_Landings', 'v1', {'years': (1900, 2000)})()
+    pd.testing.assert_frame_equal(_read(data, fmt), df.iloc[1:].reset_index(drop=True))
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('fmt', exports.EXPORT_FORMATS)
+def test_unfiltered_export_is_stored_once_per_version(fmt, tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, 'EXPORTS_DIR', str(tmp_path))
+    df = _frame()
+    first = exports.deferred_export(df, fmt, 'Meteorite_Landings', 'v1', {})()
+    second = exports.deferred_export(df, fmt, 'Meteorite_Landings', 'v1')()
+    assert first == second
+    pd.testing.assert_frame_equal(_read(first, fmt), df)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_meteorite_export_keeps_the_source_values(tmp_path, monkeypatch):
+    import datasets
+
+    monkeypatch.setattr(exports, 'EXPORTS_DIR', str(tmp_path))
+    raw = pd.read_csv(datasets.METEORITES_FILE).dropna()
+    rows = datasets.load_meteorite_rows()
+    version = datasets.dataset_version('meteorites')
+    assert exports.deferred_export(rows, 'CSV', 'Meteorite_Landings', version)() == raw.to_csv(index=False).encode('utf-8')
+
+    positions = [0, 5, len(raw) - 1]
+    data = exports.deferred_export(rows, 'CSV', 'Meteorite_Landings', version, {'years': (1900, 2000)}, rows=positions)()
+    assert data == raw.iloc[positions].to_csv(index=False).encode('utf-8')
+    # The compact frame the charts use has the same rows in the same order
+    assert (datasets.load_meteorites()['id'].to_numpy() == raw['id'].to_numpy()).all()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasets
+from filters import CATEGORY_FILTERS, MeteoriteIndex
+
+
+@pytest.fixture(scope='module')
+def landings() -> pd.DataFrame:
+    return datasets.load_meteorites()
+
+
+@pytest.fixture(scope='module')
+def index(landings) -> MeteoriteIndex:
+    return MeteoriteIndex(landings)
+
+
+def _mask(df: pd.DataFrame, years=None, mass=None, **categories) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    if years is not None:
+        mask &= df['year'].between(*years).to_numpy()
+    if mass is not None:
+        mask &= df['mass (g)'].between(*mass).to_numpy()
+    for column, values in categories.items():
+        mask &= df[column].isin(values).to_numpy()
+    return np.flatnonzero(mask)
+
+
+# Function to draw a random filter combination, as the sidebar would build it (plus unknown values)
+def _random_filters(rng: np.random.Generator, index: MeteoriteIndex) -> dict:
+    filters = {}
+    if rng.random() < 0.6:
+        filters['years'] = tuple(sorted(rng.integers(int(index.sorted_year[0]), int(index.sorted_year[-1]) + 1, 2).tolist()))
+    if rng.random() < 0.5:
+        low, high = sorted(rng.choice([0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, np.inf], 2, replace=False))
+        filters['mass'] = (low, high)
+    for column in CATEGORY_FILTERS:
+        if rng.random() < 0.4:
+            known = list(index.categories[column])
+            values = list(rng.choice(known, rng.integers(1, min(len(known), 5) + 1), replace=False))
+            filters[column] = values + (['Unknown class'] if rng.random() < 0.2 else [])
+    return filters
+
+
+def test_random_filter_combinations_match_boolean_masks(landings, index):
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        filters = _random_filters(rng, index)
+        np.testing.assert_array_equal(index.query(**filters), _mask(landings, **filters), err_msg=str(filters))
+
+
+def test_no_filter_returns_every_row(landings, index):
+    np.testing.assert_array_equal(index.query(), np.arange(len(landings)))
+
+
+@pytest.mark.parametrize('filters', [
+    {'years': (2013, 1800)},
+    {'mass': (1e12, np.inf)},
+    {'recclass': []},
+    {'recclass': ['Unknown class']},
+])
+def test_empty_results(index, filters):
+    assert len(index.query(**filters)) == 0
@@ -0,0 +1,29 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import perf
+
+
+def test_startup_phase_is_recorded_once_per_key(monkeypatch):
+    monkeypatch.setattr(perf, '_startup', {})
+    monkeypatch.setattr(perf, '_startup_keys', set())
+    for _ in range(3):
+        with perf.startup_phase('load', 'agency'):
+            with perf.startup_phase('import', 'summary'):
+                pass
+    with perf.startup_phase('load', 'fetal_health'):
+        pass
+    assert perf._startup_keys == {('load', 'agency'), ('import', 'summary'), ('load', 'fetal_health')}
+    assert set(perf._startup) == {'load', 'import'}
+
+
+def test_reruns_do_not_add_to_the_startup_time():
+    at = AppTest.from_file(os.path.join(os.getcwd(), 'main.py'), default_timeout=120)
+    at.run()
+    at.sidebar.radio[0].set_value('Project 2: Fetal Health Classification').run()
+    assert not at.exception
+    cold = perf.startup_report()
+    for _ in range(5):
+        at.run()
+    assert perf.startup_report() == cold
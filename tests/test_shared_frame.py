@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datasets import share
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'mass': [1.0, np.nan, 3.0],
+        'year': [1880.0, 1902.0, np.nan],
+    })
+
+
+WRITES = {
+    'fillna': lambda df: df.fillna(0, inplace=True),
+    'replace': lambda df: df.replace(1.0, 5.0, inplace=True),
+    'where': lambda df: df.where(df.isna(), inplace=True),
+    'mask': lambda df: df.mask(df.notna(), inplace=True),
+    'interpolate': lambda df: df.interpolate(inplace=True),
+    'ffill': lambda df: df.ffill(inplace=True),
+    'bfill': lambda df: df.bfill(inplace=True),
+    'clip': lambda df: df.clip(0, 2, inplace=True),
+    'dropna': lambda df: df.dropna(inplace=True),
+    'drop_duplicates': lambda df: df.drop_duplicates(inplace=True),
+    'sort_values': lambda df: df.sort_values('mass', inplace=True),
+    'rename': lambda df: df.rename(columns={'mass': 'weight'}, inplace=True),
+    'set_index': lambda df: df.set_index('year', inplace=True),
+    'reset_index': lambda df: df.reset_index(inplace=True),
+    'update': lambda df: df.update(pd.DataFrame({'mass': [9.0, 9.0, 9.0]})),
+    'setitem': lambda df: df.__setitem__('mass', 0.0),
+    'delitem': lambda df: df.__delitem__('mass'),
+    'insert': lambda df: df.insert(0, 'id', [1, 2, 3]),
+    'loc': lambda df: df.loc.__setitem__((0, 'mass'), 0.0),
+    'iloc': lambda df: df.iloc.__setitem__((0, 0), 0.0),
+    'at': lambda df: df.at.__setitem__((0, 'mass'), 0.0),
+    'iat': lambda df: df.iat.__setitem__((0, 0), 0.0),
+    'iadd': lambda df: df.__iadd__(1),
+}
+
+
+@pytest.mark.parametrize('write', WRITES.values(), ids=WRITES.keys())
+def test_writes_raise_and_leave_the_data_unchanged(write):
+    # As in the app, the shared frame is the only owner of its data (no copy-on-write to fall back on)
+    shared = share(_frame())
+    with pytest.raises(TypeError, match="read-only"):
+        write(shared)
+    pd.testing.assert_frame_equal(pd.DataFrame(shared), _frame())
+
+
+def test_derived_frames_are_ordinary_and_writable():
+    shared = share(_frame())
+    filled = shared.fillna({'mass': 0})
+    assert type(filled) is pd.DataFrame
+    filled.loc[0, 'mass'] = 5.0
+    assert shared['mass'].iloc[0] == 1.0
+    copy = shared.copy()
+    copy.fillna({'mass': 0}, inplace=True)
+    assert copy['mass'].tolist() == [1.0, 0.0, 3.0]
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasets
+from spatial import BORDER, EARTH_RADIUS_KM, INSIDE, INVALID, OCEAN, CountryLocator, ProximityIndex, read_boundaries, unit_vectors
+
+
+@pytest.fixture(scope='module')
+def locator() -> CountryLocator:
+    return CountryLocator.from_geojson(datasets.BOUNDARIES_FILE)
+
+
+# Function to get, per point, the country gpd.sjoin(predicate='intersects') puts it in:
+# its name when exactly one country intersects the point, 'ocean' when none and 'border' when several
+def _sjoin_countries(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    gpd = pytest.importorskip('geopandas')
+    world = gpd.read_file(datasets.BOUNDARIES_FILE)[['name', 'geometry']]
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(lon, lat), crs=world.crs)
+    joined = gpd.sjoin(points, world, how='left', predicate='intersects')
+    matches = joined.groupby(level=0)['name'].agg(['count', 'first'])
+    return np.where(matches['count'] == 0, 'ocean', np.where(matches['count'] > 1, 'border', matches['first'])).astype(object)
+
+
+def _locator_countries(locator: CountryLocator, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    code, status = locator.locate(lat, lon)
+    names = np.asarray(locator.names, dtype=object)[np.maximum(code, 0)]
+    return np.where(status == INSIDE, names, np.where(status == OCEAN, 'ocean', 'border')).astype(object)
+
+
+def test_landings_match_sjoin(locator):
+    df = datasets.load_meteorites()
+    lat, lon = df['reclat'].to_numpy(np.float64), df['reclong'].to_numpy(np.float64)
+    expected = _sjoin_countries(lat, lon)
+    actual = _locator_countries(locator, lat, lon)
+    assert (actual == expected).all(), pd.DataFrame({'lat': lat, 'lon': lon, 'sjoin': expected, 'locator': actual})[actual != expected]
+
+
+def test_random_points_match_sjoin(locator):
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(-90, 90, 100_000), rng.uniform(-180, 180, 100_000)
+    assert (_locator_countries(locator, lat, lon) == _sjoin_countries(lat, lon)).all()
+
+
+def test_vertices_shared_by_two_countries_are_on_the_border(locator):
+    _, _, edges, edge_country = read_boundaries(datasets.BOUNDARIES_FILE)
+    vertices = pd.DataFrame({'lon': edges[:, 0], 'lat': edges[:, 1], 'country': edge_country}).drop_duplicates()
+    shared = vertices[vertices.duplicated(['lon', 'lat'], keep=False)].drop_duplicates(['lon', 'lat']).head(200)
+    lat, lon = shared['lat'].to_numpy(), shared['lon'].to_numpy()
+    _, status = locator.locate(lat, lon)
+    assert len(shared) > 0
+    assert (status == BORDER).all()
+    assert (_sjoin_countries(lat, lon) == 'border').all()
+
+
+def test_invalid_coordinates(locator):
+    code, status = locator.locate(np.array([np.nan, 91.0, 10.0]), np.array([10.0, 0.0, 181.0]))
+    assert (status == INVALID).all()
+    assert (code == -1).all()
+
+
+def test_saved_locator_gives_the_same_answers(locator, tmp_path):
+    path = str(tmp_path / 'locator.npz')
+    locator.save(path)
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(-90, 90, 20_000), rng.uniform(-180, 180, 20_000)
+    for expected, actual in zip(locator.locate(lat, lon), CountryLocator.load(path).locate(lat, lon)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+# Brute-force great-circle distances (km) from one point to many (chord length to arc)
+def _distances_km(lat: np.ndarray, lon: np.ndarray, query_lat: float, query_lon: float) -> np.ndarray:
+    chord = np.sqrt(((unit_vectors(lat, lon) - unit_vectors(np.array([query_lat]), np.array([query_lon]))) ** 2).sum(axis=1))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1))
+
+
+@pytest.fixture(scope='module')
+def landings() -> tuple[np.ndarray, np.ndarray]:
+    df = datasets.load_meteorites()
+    rng = np.random.default_rng(2)
+    # The real landings, plus clusters around both poles and across the antimeridian
+    extra_lat = np.concatenate([rng.uniform(85, 90, 2_000), rng.uniform(-90, -80, 2_000), rng.uniform(-30, 30, 2_000)])
+    extra_lon = np.concatenate([rng.uniform(-180, 180, 4_000), rng.choice([-1, 1], 2_000) * rng.uniform(178, 180, 2_000)])
+    lat = np.concatenate([df['reclat'].to_numpy(np.float64), extra_lat, [np.nan, 95.0, 0.0]])
+    lon = np.concatenate([df['reclong'].to_numpy(np.float64), extra_lon, [10.0, 0.0, 0.0]])
+    return lat, lon
+
+
+@pytest.fixture(scope='module')
+def proximity(landings) -> ProximityIndex:
+    return ProximityIndex.from_points(*landings)
+
+
+def _queries() -> list[tuple[float, float]]:
+    rng = np.random.default_rng(3)
+    random = list(zip(rng.uniform(-90, 90, 40), rng.uniform(-180, 180, 40)))
+    return random + [(90, 0), (-90, 0), (89.9, 10), (-89.5, 170), (10, 179.9), (10, -179.9), (-20, 180), (0, -180), (50, 15)]
+
+
+def _valid(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    return (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & ~((lat == 0) & (lon == 0))
+
+
+@pytest.mark.parametrize('radius_km', [1, 50, 500, 3_000, 12_000, 25_000])
+def test_within_matches_brute_force(proximity, landings, radius_km):
+    lat, lon = landings
+    valid = _valid(lat, lon)
+    for query_lat, query_lon in _queries():
+        rows, km = proximity.within(query_lat, query_lon, radius_km)
+        distances = _distances_km(lat, lon, query_lat, query_lon)
+        expected = np.flatnonzero(valid & (distances <= radius_km))
+        # Points within rounding of the radius may fall either way
+        differ = np.setxor1d(rows, expected)
+        assert np.all(np.abs(distances[differ] - radius_km) < 1e-6), (query_lat, query_lon)
+        assert np.all(np.diff(km) >= 0)
+        np.testing.assert_allclose(km, distances[rows], atol=1e-6)
+
+
+@pytest.mark.parametrize('k', [1, 10, 100, 1_000])
+def test_nearest_matches_brute_force(proximity, landings, k):
+    lat, lon = landings
+    valid = _valid(lat, lon)
+    for query_lat, query_lon in _queries():
+        rows, km = proximity.nearest(query_lat, query_lon, k)
+        distances = _distances_km(lat, lon, query_lat, query_lon)
+        # Distances are compared (ties may pick different rows at the same distance)
+        np.testing.assert_allclose(km, np.sort(distances[valid])[:k], atol=1e-6)
+        np.testing.assert_allclose(distances[rows], km, atol=1e-6)
+        assert valid[rows].all()
+
+
+def test_nearest_pads_when_fewer_landings_exist():
+    index = ProximityIndex.from_points(np.array([10.0, 20.0, 30.0]), np.array([10.0, 20.0, 30.0]))
+    rows, km = index.nearest_batch(np.array([0.0]), np.array([1.0]), 5)
+    assert rows[0].tolist() == [0, 1, 2, -1, -1]
+    assert np.isinf(km[0][3:]).all()
+
+
+def test_batches_match_single_queries(proximity):
+    rng = np.random.default_rng(4)
+    lat, lon = rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)
+    rows, km = proximity.nearest_batch(lat, lon, 7)
+    offsets, within_rows, within_km = proximity.within_batch(lat, lon, 300)
+    for i in range(len(lat)):
+        np.testing.assert_allclose(km[i], proximity.nearest(lat[i], lon[i], 7)[1])
+        single_rows, single_km = proximity.within(lat[i], lon[i], 300)
+        np.testing.assert_array_equal(np.sort(within_rows[offsets[i]:offsets[i + 1]]), np.sort(single_rows))
+        np.testing.assert_allclose(within_km[offsets[i]:offsets[i + 1]], single_km)
+
+
+def test_saved_proximity_index_gives_the_same_answers(proximity, tmp_path):
+    path = str(tmp_path / 'proximity.npz')
+    proximity.save(path)
+    loaded = ProximityIndex.load(path)
+    for query_lat, query_lon in _queries()[:10]:
+        np.testing.assert_array_equal(loaded.within(query_lat, query_lon, 800)[0], proximity.within(query_lat, query_lon, 800)[0])
+        np.testing.assert_array_equal(loaded.nearest(query_lat, query_lon, 25)[1], proximity.nearest(query_lat, query_lon, 25)[1])
@@ -0,0 +1,49 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from storage import APP_ROOT, write_atomic, write_json
+
+
+def _write_text(text: str):
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+
+    return write
+
+
+def test_write_atomic_replaces_the_file(tmp_path):
+    path = tmp_path / 'nested' / 'artifact.json'
+    write_atomic(str(path), _write_text('first'))
+    write_atomic(str(path), _write_text('second'))
+    assert path.read_text() == 'second'
+    assert [p.name for p in path.parent.iterdir()] == ['artifact.json']
+
+
+def test_failed_write_keeps_the_old_file_and_leaves_no_temporary_file(tmp_path):
+    path = tmp_path / 'artifact.json'
+    write_atomic(str(path), _write_text('first'))
+
+    def fail(tmp_path: str) -> None:
+        _write_text('partial')(tmp_path)
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        write_atomic(str(path), fail)
+    assert path.read_text() == 'first'
+    assert [p.name for p in tmp_path.iterdir()] == ['artifact.json']
+
+
+def test_write_json_round_trips(tmp_path):
+    path = tmp_path / 'bake.json'
+    write_json(str(path), {'format': 1, 'jobs': {'assets': {'status': 'ok'}}})
+    assert json.loads(path.read_text()) == {'format': 1, 'jobs': {'assets': {'status': 'ok'}}}
+
+
+def test_storage_imports_no_third_party_module():
+    code = "import sys, storage; print(sorted({'numpy', 'pandas', 'pyarrow', 'streamlit'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=APP_ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
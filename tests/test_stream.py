@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+import datasets
+import summary
+
+
+@pytest.fixture(scope='module')
+def in_memory() -> tuple[pd.DataFrame, pd.DataFrame]:
+    df = datasets.load_meteorites()
+    return datasets.meteorite_cube(datasets.locate_meteorites(df)), summary.summarize(df)
+
+
+# Chunk sizes that do and do not divide the summary batches, on one worker and in a process pool
+@pytest.mark.parametrize('chunk_rows, workers', [(100_000, 1), (7_000, 1), (13_000, 2)])
+def test_streamed_cube_and_summary_equal_the_in_memory_ones(in_memory, chunk_rows, workers):
+    cube, table = datasets.stream_meteorites(datasets.METEORITES_FILE, chunk_rows, workers)
+    expected_cube, expected_table = in_memory
+    pd.testing.assert_frame_equal(cube, expected_cube, check_frame_type=False)
+    pd.testing.assert_frame_equal(table, expected_table)
+
+
+def test_rechunk_regroups_frames_into_fixed_size_chunks():
+    frames = [pd.DataFrame({'x': range(start, start + size)}) for start, size in ((0, 3), (3, 0), (3, 11), (14, 2))]
+    chunks = list(summary.rechunk(frames, 5))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 1]
+    assert pd.concat(chunks)['x'].tolist() == list(range(16))
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from summary import CategoricalSummary, summarize
+
+
+def test_distinct_count_is_exact_up_to_the_sample_size():
+    names = pd.Series([f"name {i}" for i in range(40_000)])
+    table = summarize(pd.DataFrame({'name': names}), chunk_rows=7_000)
+    assert table.loc['unique', 'name'] == 40_000
+    assert table.loc['count', 'name'] == 40_000
+
+
+def test_estimated_distinct_count_never_exceeds_the_count():
+    for seed in range(20):
+        values = pd.Series([f"{seed}-{i}" for i in np.random.default_rng(seed).permutation(300)])
+        column = CategoricalSummary(capacity=10, distinct_sample=32)
+        for start in range(0, len(values), 50):
+            column.update(values.iloc[start:start + 50])
+        result = column.result()
+        assert result['unique'] <= result['count'] == 300
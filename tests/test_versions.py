@@ -0,0 +1,38 @@
+import os
+
+import datasets
+
+
+def _count_hashes(monkeypatch) -> list[str]:
+    hashed = []
+    file_hash = datasets.file_hash
+    monkeypatch.setattr(datasets, 'file_hash', lambda filename: hashed.append(filename) or file_hash(filename))
+    return hashed
+
+
+def test_file_version_hashes_once_per_content(tmp_path, monkeypatch):
+    hashed = _count_hashes(monkeypatch)
+    path = tmp_path / 'landings.csv'
+    path.write_text('id,mass\n1,21\n')
+    first = datasets.file_version(str(path))
+    assert [datasets.file_version(str(path)) for _ in range(5)] == [first] * 5
+    assert len(hashed) == 1
+
+    path.write_text('id,mass\n1,22\n')
+    os.utime(path, ns=(0, 10**18))
+    assert datasets.file_version(str(path)) != first
+    assert len(hashed) == 2
+
+
+def test_file_version_reuses_the_columnar_fingerprint(tmp_path, monkeypatch):
+    path = tmp_path / 'landings.csv'
+    path.write_text('id,mass\n1,21\n')
+    monkeypatch.setattr(datasets, 'COLUMNAR_DIR', str(tmp_path / 'columnar'))
+    datasets.read_columnar(str(path))
+    version = datasets.file_version(str(path))
+
+    # A new process: nothing memoized, but the stored fingerprint still matches the file
+    monkeypatch.setattr(datasets, '_file_versions', {})
+    hashed = _count_hashes(monkeypatch)
+    assert datasets.file_version(str(path)) == version
+    assert hashed == []